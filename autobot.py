@@ -13,6 +13,7 @@ import sys
 import platform
 import os
 import random
+from job_control import JobStopped, WAITING_LOGIN, STOPPED
 
 # --- Configuration ---
 DEFAULT_CSV_FILE = "ilanlar.csv"
@@ -102,10 +103,8 @@ def main(csv_file=None, thread=None, test_mode=False, test_phone="", selected_te
             # If running in thread, wait for manual confirmation
             if thread:
                 thread.manual_confirmation_needed.emit()
-                while not thread.manual_confirmation:
-                    time.sleep(0.1)
-                    if thread.should_stop:
-                        return
+                if thread.control.wait_until(lambda state: state != WAITING_LOGIN) == STOPPED:
+                    return
             else:
                 input()
 
@@ -166,17 +165,13 @@ def main(csv_file=None, thread=None, test_mode=False, test_phone="", selected_te
 
         # 5) Send messages
         for idx, row in df_unique.iterrows():
-            # Check if should stop
-            if thread and thread.should_stop:
-                logging.info("WhatsApp bot durduruldu.")
-                break
-
-            # Check if paused
-            while thread and thread.is_paused:
-                time.sleep(0.1)
-                if thread.should_stop:
+            # Block while paused, stop when asked to
+            if thread:
+                try:
+                    thread.control.checkpoint()
+                except JobStopped:
                     logging.info("WhatsApp bot durduruldu.")
-                    return
+                    break
 
             # Test modunda telefon numarasını override et
             phone = test_phone if test_mode else row["Telefon"].replace("+", "").replace(" ", "")
@@ -218,7 +213,10 @@ def main(csv_file=None, thread=None, test_mode=False, test_phone="", selected_te
             time.sleep(1)
             logging.info(f"✅ Mesaj gönderildi: {phone}")
 
-            time.sleep(DELAY_BETWEEN_MESSAGES)
+            if thread:
+                thread.control.wait_for(STOPPED, timeout=DELAY_BETWEEN_MESSAGES)
+            else:
+                time.sleep(DELAY_BETWEEN_MESSAGES)
 
         logging.info("✅ Tüm mesajlar işlendi.")
 
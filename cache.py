@@ -0,0 +1,77 @@
+import threading
+import time
+
+
+class TTLCache:
+    """Small thread-safe in-process cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, ttl, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store `value` for `ttl` seconds, the cache's ttl by default"""
+        with self._lock:
+            if len(self._data) >= self.maxsize and key not in self._data:
+                self._evict()
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _evict(self):
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._data.items() if expires_at < now]:
+            del self._data[key]
+        if len(self._data) >= self.maxsize:
+            # Still full: drop the entry closest to expiry
+            del self._data[min(self._data, key=lambda k: self._data[k][0])]
+
+
+class VersionedCache:
+    """In-process cache invalidated through a version counter in Redis.
+
+    Readers pay one GET of the version key; values are reloaded only after
+    some process called invalidate().
+    """
+
+    def __init__(self, redis_client, version_key):
+        self.redis = redis_client
+        self.version_key = version_key
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def version(self):
+        return int(self.redis.get(self.version_key) or 0)
+
+    def get(self, key, loader):
+        version = self.version()
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+        value = loader()
+        with self._lock:
+            self._values[key] = (version, value)
+        return value
+
+    def invalidate(self):
+        self.redis.incr(self.version_key)
@@ -0,0 +1,23 @@
+import os
+from celery import Celery
+
+
+def make_celery(app=None):
+    """Create the Celery app; tasks run inside the Flask app context when `app` is given"""
+    celery = Celery(
+        app.name if app else 'app',
+        broker=os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0'),
+        backend=os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
+    )
+    # Webhook deliveries get their own queue so slow receivers never delay scraping
+    celery.conf.task_routes = {'worker.*webhook*': {'queue': os.getenv('WEBHOOK_QUEUE', 'webhooks')}}
+    if app is not None:
+        celery.conf.update(app.config)
+
+        class ContextTask(celery.Task):
+            def __call__(self, *args, **kwargs):
+                with app.app_context():
+                    return self.run(*args, **kwargs)
+
+        celery.Task = ContextTask
+    return celery
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+CURRENCIES = (('TRY', r'TL|₺|TRY'), ('USD', r'\$|USD'), ('EUR', r'€|EUR'), ('GBP', r'£|GBP'))
+# The whole price without its currency: Turkish ("1.250.000,50") or English ("250,000.50")
+# thousands grouping, or a plain number ("2,5", "2.5"), optionally followed by Milyon/Bin
+PRICE_RE = (r'^\s*(?:(?P<tr>\d{1,3}(?:\.\d{3})+(?:,\d+)?)|(?P<en>\d{1,3}(?:,\d{3})+(?:\.\d+)?)'
+            r'|(?P<plain>\d+(?:[.,]\d+)?))\s*(?P<unit>[Mm][İIiı][Ll][Yy][Oo][Nn]|[Bb][İIiı][Nn])?\s*$')
+MULTIPLIERS = {'m': 1e6, 'b': 1e3}
+DATE_FORMATS = ('%d.%m.%Y', '%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%d.%m.%y')
+REGION_SEPARATORS = r'\s*(?:\n|/|,|\||>)\s*'
+NEIGHBORHOOD_SUFFIX = r'\s+(?:Mah\.?|Mahallesi)$'
+
+
+def _text(values):
+    return values.fillna('').astype(str).str.strip()
+
+
+def clean_price(values):
+    """'1.250.000 TL' -> (1250000.0, 'TRY'), '2,5 Milyon TL' -> (2500000.0, 'TRY'), '$250,000' -> (250000.0, 'USD').
+
+    Unknown currencies are None; a price with anything besides one number,
+    a multiplier and the currency (ranges, notes) is NaN.
+    """
+    text = _text(values)
+    currency = pd.Series(
+        np.select([text.str.contains(pattern, regex=True) for _, pattern in CURRENCIES],
+                  [code for code, _ in CURRENCIES], default=''),
+        index=text.index
+    )
+    currency = currency.mask(currency.eq(''))
+    parts = text.str.replace('|'.join(pattern for _, pattern in CURRENCIES), '', regex=True).str.extract(PRICE_RE)
+    number = parts['tr'].str.replace('.', '', regex=False).str.replace(',', '.', regex=False) \
+        .fillna(parts['en'].str.replace(',', '', regex=False)) \
+        .fillna(parts['plain'].str.replace(',', '.', regex=False))
+    multiplier = parts['unit'].str[0].str.lower().map(MULTIPLIERS).fillna(1)
+    return pd.to_numeric(number, errors='coerce') * multiplier, currency
+
+
+def clean_date(values):
+    """Listing dates in the portal's day-first formats -> datetime64, NaT when unknown"""
+    text = _text(values)
+    parsed = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+    for date_format in DATE_FORMATS:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(text[missing], format=date_format, errors='coerce')
+    return parsed
+
+
+def clean_region(values):
+    """'İstanbul / Kadıköy / Caferağa Mah.' or the same with spaces -> il, ilçe, mahalle"""
+    text = _text(values)
+    parts = text.str.split(REGION_SEPARATORS, n=2, expand=True, regex=True).reindex(columns=range(3))
+    # No separator at all: the first two words are il and ilçe, the rest is the mahalle
+    unseparated = parts[1].isna() & text.ne('')
+    if unseparated.any():
+        words = text[unseparated].str.split(r'\s+', n=2, expand=True, regex=True).reindex(columns=range(3))
+        parts.loc[unseparated] = words.values
+    parts[2] = parts[2].fillna('').astype(str).str.replace(NEIGHBORHOOD_SUFFIX, '', regex=True)
+    parts = parts.mask(parts.isna() | parts.eq(''))
+    return parts[0], parts[1], parts[2]
+
+
+def clean_phone(values):
+    """Turkish numbers in any spacing or prefix ('0532 123 45 67', '+90 (532) ...') -> '+905321234567'"""
+    digits = _text(values).str.replace(r'\D', '', regex=True)
+    national = digits.str.replace(r'^(?:0090|90|0)(?=\d{10}$)', '', regex=True)
+    return ('+90' + national).where(national.str.fullmatch(r'[2-5]\d{9}'), None)
+
+
+def clean_listings(df):
+    """Add typed columns for the raw listing fields that are present in `df`"""
+    if 'price' in df:
+        df['price_amount'], df['currency'] = clean_price(df['price'])
+    if 'listed_on' in df:
+        df['listed_date'] = clean_date(df['listed_on'])
+    if 'region' in df:
+        df['city'], df['district'], df['neighborhood'] = clean_region(df['region'])
+    if 'phone' in df:
+        df['phone_e164'] = clean_phone(df['phone'])
+    return df
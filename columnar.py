@@ -0,0 +1,76 @@
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Few distinct values per job, stored once per row group instead of once per row
+DICTIONARY_COLUMNS = ('IslemTipi', 'Cinsi', 'Turu', 'Bolge', 'IlanSahibi')
+ROW_GROUP_ROWS = 5000
+
+
+def parquet_path(result_path):
+    """results/job_<id>.csv.gz -> results/job_<id>.parquet"""
+    base = result_path
+    for suffix in ('.gz', '.csv'):
+        base = base.removesuffix(suffix)
+    return base + '.parquet'
+
+
+class ParquetResultWriter:
+    """Writes result rows to Parquet, one row group every ROW_GROUP_ROWS rows.
+
+    Only the rows of the current row group are held in memory, as one list
+    per column; values of DICTIONARY_COLUMNS are interned per job, so a
+    repeated value is held once. Like ResultWriter, the file is written to
+    `<path>.part` and renamed on close.
+    """
+
+    def __init__(self, path, fieldnames):
+        self.path = path
+        self.part_path = path + '.part'
+        self.fieldnames = list(fieldnames)
+        self.schema = pa.schema([(name, pa.string()) for name in self.fieldnames])
+        self.rows = 0
+        self._pending = 0
+        self._columns = {name: [] for name in self.fieldnames}
+        self._values = {name: {} for name in self.fieldnames if name in DICTIONARY_COLUMNS}
+        self._writer = pq.ParquetWriter(
+            self.part_path, self.schema, compression='zstd',
+            use_dictionary=[name for name in self.fieldnames if name in DICTIONARY_COLUMNS]
+        )
+
+    def write(self, row):
+        for name, column in self._columns.items():
+            value = row.get(name)
+            if value is not None and name in self._values:
+                value = self._values[name].setdefault(value, value)
+            column.append(value)
+        self.rows += 1
+        self._pending += 1
+        if self._pending >= ROW_GROUP_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._writer.write_table(pa.table(self._columns, schema=self.schema))
+            for column in self._columns.values():
+                column.clear()
+            self._pending = 0
+
+    def close(self):
+        if self._writer is None:
+            return self.rows
+        self._flush()
+        self._writer.close()
+        self._writer = None
+        if self.rows:
+            os.replace(self.part_path, self.path)
+        else:
+            self.discard()
+        return self.rows
+
+    def discard(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
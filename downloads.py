@@ -0,0 +1,65 @@
+import gzip
+import os
+import urllib.parse
+from flask import abort, current_app, request, send_file
+from results import mark_accessed
+
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+
+def resolve_result_path(path):
+    """Absolute path of a stored result, 404 when it is missing or outside the app directory"""
+    root = current_app.root_path
+    full_path = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full_path]) != root or not os.path.isfile(full_path):
+        abort(404)
+    return full_path
+
+
+def send_result(path, download_name, mimetype='text/csv'):
+    """Send a result file, or only authorize it and let the front proxy do the transfer.
+
+    DOWNLOAD_OFFLOAD='x-accel' answers with an empty body and an X-Accel-Redirect
+    to X_ACCEL_PREFIX + the path relative to the app directory (nginx internal
+    location). 'x-sendfile' goes through Flask's USE_X_SENDFILE. Without
+    offloading, send_file hands the file to the WSGI server's file_wrapper,
+    which gunicorn transfers with sendfile().
+
+    Gzip-compressed results go out as stored with Content-Encoding: gzip when
+    the client accepts it, so they are never decompressed on the server;
+    other clients get a decompressed stream.
+    """
+    full_path = resolve_result_path(path)
+    mark_accessed(full_path)
+    if not full_path.endswith('.gz'):
+        return _transfer(full_path, download_name, mimetype)
+    if not request.accept_encodings['gzip']:
+        response = _send_decompressed(full_path, download_name, mimetype)
+    else:
+        response = _transfer(full_path, download_name, mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def _transfer(full_path, download_name, mimetype):
+    if current_app.config.get('DOWNLOAD_OFFLOAD') == 'x-accel':
+        relative = os.path.relpath(full_path, current_app.root_path).replace(os.sep, '/')
+        response = current_app.response_class(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = (
+            current_app.config['X_ACCEL_PREFIX'].rstrip('/') + '/' + urllib.parse.quote(relative)
+        )
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+        return response
+    return send_file(full_path, mimetype=mimetype, as_attachment=True, download_name=download_name)
+
+
+def _send_decompressed(full_path, download_name, mimetype):
+    def generate():
+        with gzip.open(full_path, 'rb') as f:
+            while chunk := f.read(DECOMPRESS_CHUNK_SIZE):
+                yield chunk
+
+    response = current_app.response_class(generate(), mimetype=mimetype)
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    return response
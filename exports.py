@@ -0,0 +1,101 @@
+import csv
+import gzip
+import json
+import os
+import uuid
+from results import COMPRESS_LEVEL, open_result
+
+# format: (cached file extension, mimetype, entry of the plan's export_formats)
+EXPORT_FORMATS = {
+    'csv': (None, 'text/csv', 'csv'),
+    'jsonl': ('jsonl.gz', 'application/x-ndjson', 'json'),
+    'json': ('json.gz', 'application/json', 'json'),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'excel'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet', 'parquet'),
+}
+XLSX_MAX_ROWS = 1048576
+
+
+def export_path(source_path, job_id, fmt):
+    """Cached export next to the result, so retention removes both together"""
+    if fmt == 'parquet':
+        # Same file the worker writes while scraping; only older results are converted
+        return os.path.join(os.path.dirname(source_path), f'job_{job_id}.parquet')
+    return os.path.join(os.path.dirname(source_path), f'job_{job_id}_export.{EXPORT_FORMATS[fmt][0]}')
+
+
+def write_jsonl(reader, f):
+    for row in reader:
+        f.write(json.dumps(row, ensure_ascii=False))
+        f.write('\n')
+
+
+def write_json(reader, f):
+    f.write('[')
+    for i, row in enumerate(reader):
+        f.write(',\n' if i else '\n')
+        f.write(json.dumps(row, ensure_ascii=False))
+    f.write('\n]\n')
+
+
+def write_xlsx(reader, path):
+    """Row by row in xlsxwriter's constant_memory mode, a new sheet every XLSX_MAX_ROWS"""
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'strings_to_urls': False,
+                                          'strings_to_formulas': False})
+    try:
+        sheet = None
+        row_num = XLSX_MAX_ROWS
+        for row in reader:
+            if row_num == XLSX_MAX_ROWS:
+                sheet = workbook.add_worksheet()
+                sheet.write_row(0, 0, reader.fieldnames)
+                row_num = 1
+            sheet.write_row(row_num, 0, [row[field] for field in reader.fieldnames])
+            row_num += 1
+        if sheet is None:
+            workbook.add_worksheet().write_row(0, 0, reader.fieldnames or [])
+    finally:
+        workbook.close()
+
+
+def build_export(source_path, target_path, fmt):
+    with open_result(source_path) as source:
+        reader = csv.DictReader(source)
+        if fmt == 'xlsx':
+            write_xlsx(reader, target_path)
+            return
+        if fmt == 'parquet':
+            from columnar import ParquetResultWriter
+            writer = ParquetResultWriter(target_path, reader.fieldnames)
+            for row in reader:
+                writer.write(row)
+            writer.close()
+            return
+        with gzip.open(target_path, 'wt', encoding='utf-8', compresslevel=COMPRESS_LEVEL) as f:
+            (write_json if fmt == 'json' else write_jsonl)(reader, f)
+
+
+def get_export(source_path, job_id, fmt):
+    """Path of a job result in `fmt`, converted from the stored CSV once and reused afterwards.
+
+    Conversion streams row by row, so memory does not grow with the result.
+    """
+    if fmt == 'csv':
+        return source_path
+    target_path = export_path(source_path, job_id, fmt)
+    try:
+        if os.path.getmtime(target_path) >= os.path.getmtime(source_path):
+            return target_path
+    except OSError:
+        pass
+    # Unique part file: concurrent downloads of the same export never share one
+    part_path = f'{target_path}.{uuid.uuid4().hex}.part'
+    try:
+        build_export(source_path, part_path, fmt)
+        os.replace(part_path, target_path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    return target_path
@@ -0,0 +1,36 @@
+import os
+import redis
+from dotenv import load_dotenv
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import LoginManager
+from flask_migrate import Migrate
+from cache import TTLCache, VersionedCache
+from quota import DailyQuota
+from rate_limit import SlidingWindowLimiter
+from seen_set import SeenSet
+
+# Load environment variables
+load_dotenv()
+
+# Initialize database
+db = SQLAlchemy()
+migrate = Migrate()
+
+# Initialize login manager
+login_manager = LoginManager()
+login_manager.login_view = 'views.login'
+
+# Redis setup for progress/logs
+redis_client = redis.StrictRedis.from_url(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+daily_quota = DailyQuota(redis_client)
+api_rate_limiter = SlidingWindowLimiter(redis_client, 'ratelimit:api')
+# Listing IDs each user's jobs have stored, so jobs can skip detail pages fetched recently
+seen_set = SeenSet(redis_client)
+
+# Caches that keep authenticated and polling requests off the database
+# user_cache is per process: a plan change only clears the entry in the process that made it,
+# other web workers keep the old User (downgrades included) for up to USER_CACHE_TTL seconds
+user_cache = TTLCache(ttl=int(os.getenv('USER_CACHE_TTL', 30)))
+template_cache = VersionedCache(redis_client, 'templates:version')
+webhook_cache = VersionedCache(redis_client, 'webhooks:version')
+api_key_cache = TTLCache(ttl=int(os.getenv('API_KEY_CACHE_TTL', 300)))
@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+
+# Control states shared by the Celery tasks, the web routes and the desktop threads
+WAITING_LOGIN = 'waiting_login'
+LOGIN_CONFIRMED = 'continue'
+RUNNING = 'running'
+PAUSED = 'paused'
+STOPPED = 'stopped'
+# A paused worker job holds a worker and a browser, so it is stopped after this long (0 waits forever)
+JOB_MAX_PAUSE_SECONDS = int(os.getenv('JOB_MAX_PAUSE_SECONDS', 3600))
+SUBSCRIBE_TIMEOUT = 5
+
+
+class JobStopped(Exception):
+    """Raised at a checkpoint once the job has been asked to stop"""
+    reason = 'Job stopped by user.'
+    log_message = 'Kullanıcı tarafından durduruldu.'
+
+
+class PauseExpired(JobStopped):
+    """Raised at a checkpoint when the job stayed paused longer than its max_pause"""
+    reason = 'Job stopped after being paused too long.'
+    log_message = 'Çok uzun süre duraklatıldı, iş durduruldu.'
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
+
+
+class _JobControl:
+    # Seconds a checkpoint waits while paused before stopping the job, None waits forever
+    max_pause = None
+
+    def wait_for(self, *states, timeout=None):
+        """Block until the job reaches one of `states`; returns None on timeout"""
+        return self.wait_until(lambda state: state in states, timeout=timeout)
+
+    def checkpoint(self):
+        """Block while the job is paused and raise JobStopped once it is stopped"""
+        state = self.wait_until(lambda state: state != PAUSED, timeout=self.max_pause)
+        if state is None:
+            self.set_state(STOPPED)
+            raise PauseExpired()
+        if state == STOPPED:
+            raise JobStopped()
+        return state
+
+    @property
+    def stopped(self):
+        return self.state() == STOPPED
+
+    @property
+    def paused(self):
+        return self.state() == PAUSED
+
+    def close(self):
+        pass
+
+
+class RedisJobControl(_JobControl):
+    """Job control channel backed by a Redis key plus a pub/sub channel.
+
+    The key keeps the last state for late readers; every change is also
+    published so a subscribed worker wakes up immediately instead of
+    re-reading the key in a sleep loop.
+    """
+
+    def __init__(self, redis_client, state_key, max_pause=JOB_MAX_PAUSE_SECONDS):
+        self.redis = redis_client
+        self.state_key = state_key
+        self.max_pause = max_pause or None
+        self.channel = f'{state_key}:control'
+        self._pubsub = None
+        self._state = None
+        self._subscribed = False
+
+    def set_state(self, state):
+        pipe = self.redis.pipeline()
+        pipe.set(self.state_key, state)
+        pipe.publish(self.channel, state)
+        pipe.execute()
+
+    def subscribe(self):
+        if self._pubsub is None:
+            self._pubsub = self.redis.pubsub()
+            self._pubsub.subscribe(self.channel)
+            # subscribe() does not wait for Redis to confirm; changes published before
+            # that are not delivered, so the key is only read once it has confirmed
+            deadline = time.monotonic() + SUBSCRIBE_TIMEOUT
+            while not self._subscribed and time.monotonic() < deadline:
+                self._receive(deadline - time.monotonic())
+            self._state = _decode(self.redis.get(self.state_key))
+        return self
+
+    def _receive(self, timeout):
+        message = self._pubsub.get_message(timeout=timeout)
+        if message is None:
+            return False
+        if message['type'] == 'subscribe':
+            self._subscribed = True
+        elif message['type'] == 'message':
+            self._state = _decode(message['data'])
+        return True
+
+    def state(self):
+        self.subscribe()
+        # Drain whatever is already buffered without a round trip to Redis
+        while self._receive(0):
+            pass
+        if not self._subscribed:
+            # Still unconfirmed, a published change may have been missed
+            self._state = _decode(self.redis.get(self.state_key))
+        return self._state
+
+    def wait_until(self, predicate, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        state = self.state()
+        while not predicate(state):
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+            self._receive(remaining)
+            state = self._state
+        return state
+
+    def close(self):
+        if self._pubsub is not None:
+            try:
+                self._pubsub.close()
+            except Exception:
+                pass
+            self._pubsub = None
+            self._subscribed = False
+
+
+class LocalJobControl(_JobControl):
+    """In-process job control channel for the desktop QThreads"""
+
+    def __init__(self, state=None):
+        self._state = state
+        self._condition = threading.Condition()
+
+    def set_state(self, state):
+        with self._condition:
+            self._state = state
+            self._condition.notify_all()
+
+    def state(self):
+        return self._state
+
+    def wait_until(self, predicate, timeout=None):
+        with self._condition:
+            if not self._condition.wait_for(lambda: predicate(self._state), timeout):
+                return None
+            return self._state
@@ -0,0 +1,116 @@
+import json
+import os
+import re
+import time
+
+# Stream length cap per job (approximate, XADD MAXLEN ~)
+EVENT_STREAM_MAXLEN = int(os.getenv('JOB_EVENT_STREAM_MAXLEN', 10000))
+# How long streams and progress keys stay in Redis after a job finishes
+EVENT_RETENTION_SECONDS = int(os.getenv('JOB_EVENT_RETENTION_SECONDS', 24 * 3600))
+# Completed streams are archived here as JSON lines
+EVENT_ARCHIVE_DIR = os.getenv('JOB_EVENT_ARCHIVE_DIR', 'job_logs')
+# <ms>-<seq>, both within Redis' 64-bit range
+STREAM_ID_RE = re.compile(r'\d{1,19}-\d{1,19}')
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
+
+
+def is_stream_id(value):
+    return bool(STREAM_ID_RE.fullmatch(value))
+
+
+def _parse_id(stream_id):
+    ms, _, seq = stream_id.partition('-')
+    return int(ms), int(seq or 0)
+
+
+class JobEventLog:
+    """Structured, bounded event log for a job stored in a Redis Stream.
+
+    Entries are replayable from any stream ID. Once the job finishes the
+    stream is archived to disk and given a TTL, so Redis only holds the
+    events of running and recently finished jobs.
+    """
+
+    def __init__(self, redis_client, stream_key, archive_name, maxlen=EVENT_STREAM_MAXLEN):
+        self.redis = redis_client
+        self.stream_key = stream_key
+        self.archive_path = os.path.join(EVENT_ARCHIVE_DIR, f'{archive_name}.jsonl')
+        self.maxlen = maxlen
+
+    def append(self, event_type, **fields):
+        fields['type'] = event_type
+        fields['ts'] = f'{time.time():.3f}'
+        entry_id = self.redis.xadd(self.stream_key, fields, maxlen=self.maxlen, approximate=True)
+        return _decode(entry_id)
+
+    def log(self, msg):
+        return self.append('log', msg=msg)
+
+    def read(self, after=None, count=None):
+        """Return [(id, fields)] for entries after `after` (all entries if None)"""
+        start = f'({after}' if after else '-'
+        entries = self.redis.xrange(self.stream_key, min=start, max='+', count=count)
+        if entries:
+            return [(_decode(entry_id), {_decode(k): _decode(v) for k, v in fields.items()})
+                    for entry_id, fields in entries]
+        if not self.redis.exists(self.stream_key):
+            return self._read_archive(after, count)
+        return []
+
+    def _read_archive(self, after=None, count=None):
+        if not os.path.exists(self.archive_path):
+            return []
+        after_key = _parse_id(after) if after else None
+        entries = []
+        with open(self.archive_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                if after_key and _parse_id(entry['id']) <= after_key:
+                    continue
+                entries.append((entry['id'], entry['fields']))
+                if count and len(entries) >= count:
+                    break
+        return entries
+
+    def archive(self):
+        """Write the whole stream to the archive file, returns the number of entries"""
+        os.makedirs(os.path.dirname(self.archive_path), exist_ok=True)
+        written = 0
+        tmp_path = f'{self.archive_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            last_id = None
+            while True:
+                batch = self.read(after=last_id, count=1000)
+                if not batch:
+                    break
+                for entry_id, fields in batch:
+                    f.write(json.dumps({'id': entry_id, 'fields': fields}, ensure_ascii=False) + '\n')
+                written += len(batch)
+                last_id = batch[-1][0]
+        os.replace(tmp_path, self.archive_path)
+        return written
+
+    def finish(self, status, *related_keys, ttl=EVENT_RETENTION_SECONDS):
+        """Record the final status, archive the stream and expire it with its related keys"""
+        self.append('status', status=status)
+        try:
+            self.archive()
+        except OSError:
+            pass
+        pipe = self.redis.pipeline()
+        for key in (self.stream_key,) + related_keys:
+            pipe.expire(key, ttl)
+        pipe.execute()
+
+
+def replay(events, since=None):
+    """Split a read into the log lines and the last seen stream ID for the live endpoints"""
+    entries = events.read(after=since)
+    logs = [fields.get('msg', '') for _, fields in entries if fields.get('type') == 'log']
+    last_id = entries[-1][0] if entries else since
+    return logs, last_id
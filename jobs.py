@@ -0,0 +1,307 @@
+import base64
+import json
+import os
+import uuid
+from datetime import datetime
+from sqlalchemy import case, func, tuple_
+from sqlalchemy.exc import IntegrityError
+from extensions import db, redis_client, webhook_cache
+from models import ScrapingJob, UserJobStats, Webhook
+from job_control import RedisJobControl
+from job_events import JobEventLog
+
+# Celery task names, shared so the web process can enqueue without importing the worker
+SCRAPE_TASK = 'worker.process_scraping_job'
+WHATSAPP_TASK = 'worker.whatsapp_bot_task'
+REVY_TASK = 'worker.process_revy_job'
+WEBHOOK_FLUSH_TASK = 'worker.flush_webhook_events'
+WEBHOOK_DELIVER_TASK = 'worker.deliver_webhook'
+RETENTION_TASK = 'worker.enforce_retention'
+
+REVY_LOGIN_URL = 'https://www.revy.com.tr/login'
+REVY_LISTINGS_URL = 'https://www.revy.com.tr/app/portfoy/ilanlar?export=0&fsbo=true&area=my&advertisement_status=active'
+
+JOB_SNAPSHOT_TTL = 3600
+# Revy credentials only wait in Redis until the worker picks the job up
+REVY_CREDENTIALS_TTL = 3600
+
+# Events of one user inside this window go out as a single webhook delivery
+WEBHOOK_COALESCE_SECONDS = float(os.getenv('WEBHOOK_COALESCE_SECONDS', 2))
+
+PROGRESS_FIELDS = ('progress', 'total_ads', 'processed_ads', 'current_page')
+
+# Result bytes per user as measured by the last retention run
+STORAGE_USAGE_KEY = 'storage:usage'
+WHATSAPP_RESULT_RETENTION_SECONDS = int(os.getenv('WHATSAPP_RESULT_RETENTION_DAYS', 7)) * 86400
+
+_celery = None
+
+def get_celery():
+    """Celery client for enqueueing, imported on first use so web workers boot without it"""
+    global _celery
+    if _celery is None:
+        from celery_app import make_celery
+        _celery = make_celery()
+    return _celery
+
+def enqueue(task_name, *args):
+    return get_celery().send_task(task_name, args=list(args))
+
+def enqueue_group(task_name, arg_lists, group_id):
+    """Send one task per argument tuple as a Celery group, published over a single connection"""
+    from celery import group
+    app = get_celery()
+    return group(app.signature(task_name, args=list(args)) for args in arg_lists).apply_async(task_id=group_id)
+
+def job_control(job_id):
+    return RedisJobControl(redis_client, f'job:{job_id}:state')
+
+def whatsapp_control(task_id):
+    return RedisJobControl(redis_client, f'wa_state:{task_id}')
+
+def job_events(job_id):
+    return JobEventLog(redis_client, f'job:{job_id}:events', f'job_{job_id}')
+
+def whatsapp_events(task_id):
+    return JobEventLog(redis_client, f'wa_events:{task_id}', f'whatsapp_{task_id}')
+
+class JobProgress:
+    """Progress counters and live log of a scraping job, as served by /api/job/<id>/live"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.events = job_events(job_id)
+        self.keys = {field: f'job:{job_id}:{field}' for field in PROGRESS_FIELDS}
+
+    def log(self, msg):
+        self.events.log(msg)
+
+    def set(self, **values):
+        pipe = redis_client.pipeline()
+        for field, value in values.items():
+            pipe.set(self.keys[field], value)
+        pipe.execute()
+
+    def get(self):
+        values = redis_client.mget(list(self.keys.values()))
+        return {field: int(value or 0) for field, value in zip(self.keys, values)}
+
+    def finish(self, status):
+        self.events.finish(status, *self.keys.values(), f'job:{self.job_id}:state')
+
+def store_revy_credentials(job_id, username, password):
+    # Kept out of the task arguments so they never reach the broker or result backend
+    redis_client.set(f'job:{job_id}:credentials', json.dumps({'username': username, 'password': password}),
+                     ex=REVY_CREDENTIALS_TTL)
+
+def set_whatsapp_owner(task_id, user_id):
+    # Kept as long as the task's result, the task routes check it
+    redis_client.set(f'wa_owner:{task_id}', user_id, ex=WHATSAPP_RESULT_RETENTION_SECONDS)
+
+def whatsapp_owner(task_id):
+    owner = redis_client.get(f'wa_owner:{task_id}')
+    return int(owner) if owner else None
+
+def pop_revy_credentials(job_id):
+    key = f'job:{job_id}:credentials'
+    pipe = redis_client.pipeline()
+    pipe.get(key)
+    pipe.delete(key)
+    value, _ = pipe.execute()
+    return json.loads(value) if value else None
+
+def set_revy_session_saved(user_id, saved):
+    # The vault lives on the workers; this flag lets the web skip asking for credentials
+    if saved:
+        redis_client.set(f'revy_session:{user_id}', 1)
+    else:
+        redis_client.delete(f'revy_session:{user_id}')
+
+def has_revy_session(user_id):
+    return bool(redis_client.exists(f'revy_session:{user_id}'))
+
+def has_webhooks(user_id):
+    return webhook_cache.get(user_id, lambda: db.session.query(
+        Webhook.query.filter_by(user_id=user_id).exists()).scalar())
+
+def queue_webhook_event(user_id, event, data):
+    """Buffer an event for the user's webhooks; the first event of a burst schedules the flush"""
+    if not has_webhooks(user_id):
+        return
+    payload = json.dumps({
+        'id': uuid.uuid4().hex,
+        'event': event,
+        'created_at': datetime.utcnow().isoformat(),
+        'data': data
+    })
+    pending_key = f'webhooks:pending:{user_id}'
+    pipe = redis_client.pipeline()
+    pipe.rpush(pending_key, payload)
+    pipe.expire(pending_key, 86400)
+    pipe.set(f'webhooks:scheduled:{user_id}', 1, nx=True, ex=300)
+    scheduled = pipe.execute()[-1]
+    if scheduled:
+        get_celery().send_task(WEBHOOK_FLUSH_TASK, args=[user_id], countdown=WEBHOOK_COALESCE_SECONDS)
+
+def count_daily_jobs(user_id):
+    today = datetime.utcnow().date()
+    return ScrapingJob.query.filter(
+        ScrapingJob.user_id == user_id,
+        ScrapingJob.created_at >= today
+    ).count()
+
+def aggregate_job_stats(user_id):
+    """Count total, completed and failed jobs of a user in one pass"""
+    total, completed, failed = db.session.query(
+        func.count(ScrapingJob.id),
+        func.coalesce(func.sum(case((ScrapingJob.status == 'completed', 1), else_=0)), 0),
+        func.coalesce(func.sum(case((ScrapingJob.status == 'failed', 1), else_=0)), 0)
+    ).filter(ScrapingJob.user_id == user_id).one()
+    return total, completed, failed
+
+def get_job_stats(user_id):
+    """Return the user's stats row, building it from the jobs table if missing"""
+    stats = UserJobStats.query.get(user_id)
+    if stats:
+        return stats
+    total, completed, failed = aggregate_job_stats(user_id)
+    stats = UserJobStats(user_id=user_id, total_jobs=total, completed_jobs=completed, failed_jobs=failed)
+    try:
+        with db.session.begin_nested():
+            db.session.add(stats)
+    except IntegrityError:
+        # Created concurrently by another request
+        stats = UserJobStats.query.get(user_id)
+    return stats
+
+def get_batch_summary(user_id, batch_id):
+    """Aggregate status of a job batch in one grouped query, None if the user has no such batch"""
+    counts = dict(db.session.query(ScrapingJob.status, func.count(ScrapingJob.id)).filter(
+        ScrapingJob.batch_id == batch_id,
+        ScrapingJob.user_id == user_id
+    ).group_by(ScrapingJob.status).all())
+    if not counts:
+        return None
+    total = sum(counts.values())
+    finished = counts.get('completed', 0) + counts.get('failed', 0)
+    return {
+        'batch_id': batch_id,
+        'total': total,
+        'counts': counts,
+        'finished': finished,
+        'progress': int(finished / total * 100),
+        'done': finished == total
+    }
+
+JOB_LIST_FIELDS = ('id', 'url', 'status', 'template_id', 'batch_id', 'created_at', 'completed_at', 'result')
+
+def encode_job_cursor(created_at, job_id):
+    raw = f'{created_at.isoformat()}|{job_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_job_cursor(cursor):
+    """Inverse of encode_job_cursor; raises ValueError for anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, job_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(job_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def list_jobs(user_id, fields, statuses=None, batch_id=None, cursor=None, limit=50):
+    """One page of a user's jobs, newest first, continuing after `cursor` (keyset on created_at, id)
+
+    Only the requested columns are selected. Returns (rows as dicts, next cursor or None).
+    """
+    columns = [getattr(ScrapingJob, field) for field in fields]
+    query = db.session.query(ScrapingJob.created_at.label('_created_at'), ScrapingJob.id.label('_id'), *columns)
+    query = query.filter(ScrapingJob.user_id == user_id)
+    if statuses:
+        query = query.filter(ScrapingJob.status.in_(statuses))
+    if batch_id:
+        query = query.filter(ScrapingJob.batch_id == batch_id)
+    if cursor:
+        created_at, job_id = decode_job_cursor(cursor)
+        query = query.filter(tuple_(ScrapingJob.created_at, ScrapingJob.id) < tuple_(created_at, job_id))
+    rows = query.order_by(ScrapingJob.created_at.desc(), ScrapingJob.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_job_cursor(rows[limit - 1]._created_at, rows[limit - 1]._id) if len(rows) > limit else None
+    jobs = []
+    for row in rows[:limit]:
+        job = {}
+        for field in fields:
+            value = getattr(row, field)
+            job[field] = value.isoformat() if isinstance(value, datetime) else value
+        jobs.append(job)
+    return jobs, next_cursor
+
+def get_job_statuses(user_id, job_ids):
+    rows = db.session.query(ScrapingJob.id, ScrapingJob.status).filter(
+        ScrapingJob.user_id == user_id,
+        ScrapingJob.id.in_(job_ids)
+    ).all()
+    return {job_id: status for job_id, status in rows}
+
+def update_job_stats(user_id, **deltas):
+    values = {getattr(UserJobStats, column): getattr(UserJobStats, column) + delta
+              for column, delta in deltas.items()}
+    values[UserJobStats.updated_at] = datetime.utcnow()
+    updated = UserJobStats.query.filter_by(user_id=user_id).update(values, synchronize_session=False)
+    if not updated:
+        # No row yet: build it from the jobs table, which already includes this change
+        db.session.flush()
+        get_job_stats(user_id)
+
+def set_job_status(job, status):
+    """Change a job's status and keep the owner's UserJobStats row in step"""
+    # Read the stored status, the caller's object may be stale (e.g. stopped from the web)
+    previous = db.session.query(ScrapingJob.status).filter_by(id=job.id).with_for_update().scalar()
+    job.status = status
+    deltas = {}
+    for bucket, column in (('completed', 'completed_jobs'), ('failed', 'failed_jobs')):
+        if previous == bucket and status != bucket:
+            deltas[column] = -1
+        elif status == bucket and previous != bucket:
+            deltas[column] = 1
+    if deltas:
+        update_job_stats(job.user_id, **deltas)
+    if status in ('completed', 'failed') and previous != status:
+        # Sent by commit_job once the new status is stored
+        db.session.info.setdefault('finished_jobs', []).append(job)
+
+def cache_job_snapshot(job, only_if_missing=False):
+    snapshot = {
+        'user_id': job.user_id,
+        'status': job.status,
+        'created_at': job.created_at.isoformat(),
+        'completed_at': job.completed_at.isoformat() if job.completed_at else None,
+        'result': job.result
+    }
+    # Fallback fills use NX so they never overwrite a fresher write from commit_job
+    redis_client.set(f'job:{job.id}:snapshot', json.dumps(snapshot), ex=JOB_SNAPSHOT_TTL, nx=only_if_missing)
+    return snapshot
+
+def get_job_snapshot(job_id):
+    """Job status as seen by the polling endpoints, read from Redis when possible"""
+    cached = redis_client.get(f'job:{job_id}:snapshot')
+    if cached:
+        return json.loads(cached)
+    job = ScrapingJob.query.get(job_id)
+    if not job:
+        return None
+    return cache_job_snapshot(job, only_if_missing=True)
+
+def commit_job(job):
+    finished = db.session.info.pop('finished_jobs', [])
+    db.session.commit()
+    snapshot = cache_job_snapshot(job)
+    for finished_job in finished:
+        data = snapshot if finished_job is job else cache_job_snapshot(finished_job)
+        queue_webhook_event(finished_job.user_id, f'job.{data["status"]}', {
+            'job_id': finished_job.id,
+            'batch_id': finished_job.batch_id,
+            'url': finished_job.url,
+            'status': data['status'],
+            'created_at': data['created_at'],
+            'completed_at': data['completed_at'],
+            'download_url': f'/api/job/{finished_job.id}/download' if data['status'] == 'completed' else None
+        })
@@ -0,0 +1,173 @@
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db, seen_set
+from models import Listing, ScrapingJob
+from cleaning import clean_listings
+from results import (LINK_COLUMNS, PORTAL_ID_RE, listing_key, parse_portal_id, read_hashes, read_rows,
+                     read_row_numbers)
+from jobs import REVY_LISTINGS_URL
+from price_history import stored_prices, record_observations, mark_removed
+
+LISTING_BATCH_SIZE = 1000
+# Listings an earlier job stored this recently are copied instead of visited again, 0 turns it off
+SEEN_MAX_AGE_HOURS = float(os.getenv('SEEN_MAX_AGE_HOURS', 24))
+# Result column -> Listing column, for the default template and Revy jobs
+LISTING_FIELDS = {
+    'Ilan Basligi': 'title',
+    'Başlık': 'title',
+    'IslemTipi': 'transaction_type',
+    'Cinsi': 'property_type',
+    'Turu': 'category',
+    'Bolge': 'region',
+    'IlanSahibi': 'owner',
+    'Fiyat': 'price',
+    'IlanTarihi': 'listed_on',
+    'Telefon': 'phone',
+}
+TYPED_FIELDS = ('price_amount', 'currency', 'listed_date', 'city', 'district', 'neighborhood', 'phone_e164')
+
+
+def listing_batch(chunk, user_id, job_id, now, copied=()):
+    """Listing values for a chunk of result rows (all strings), cleaned column by column.
+
+    `copied` holds the portal IDs whose rows were copied from an earlier result
+    instead of fetched, they keep their last_fetched_at.
+    """
+    link_column = next((c for c in LINK_COLUMNS if c in chunk), None)
+    if link_column is None:
+        return []
+    df = pd.DataFrame({field: chunk[column] for column, field in LISTING_FIELDS.items() if column in chunk})
+    df = df.mask(df.eq(''))
+    df['url'] = chunk[link_column]
+    df['portal_id'] = df['url'].str.extract(PORTAL_ID_RE, expand=False)
+    # One row per listing and statement, Postgres rejects updating a row twice
+    df = df[df['portal_id'].notna()].drop_duplicates('portal_id', keep='last').copy()
+    clean_listings(df)
+    if 'listed_date' in df:
+        df['listed_date'] = df['listed_date'].dt.date
+    df['user_id'] = user_id
+    df['first_seen_at'] = df['last_seen_at'] = now
+    df['last_fetched_at'] = pd.Series(now, index=df.index).mask(df['portal_id'].isin(copied))
+    df['last_job_id'] = job_id
+    df['status'] = 'active'
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def upsert_listings(rows):
+    """Insert or update Listing rows in one statement (ON CONFLICT on user and portal ID).
+
+    A field that came back empty keeps its stored value, first_seen_at is never
+    overwritten. SQLAlchemy sends the rows as multi-row VALUES batches.
+    Returns {portal_id: listing id}.
+    """
+    if not rows:
+        return {}
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    stmt = dialect.insert(Listing)
+    table = Listing.__table__
+    updates = {'url': stmt.excluded.url, 'last_seen_at': stmt.excluded.last_seen_at,
+               'last_job_id': stmt.excluded.last_job_id, 'status': stmt.excluded.status,
+               'last_fetched_at': func.coalesce(stmt.excluded.last_fetched_at, table.c.last_fetched_at)}
+    for field in set(LISTING_FIELDS.values()) | set(TYPED_FIELDS):
+        updates[field] = func.coalesce(stmt.excluded[field], table.c[field])
+    stmt = stmt.on_conflict_do_update(index_elements=['user_id', 'portal_id'], set_=updates)
+    result = db.session.execute(stmt.returning(Listing.portal_id, Listing.id), rows)
+    return dict(result.all())
+
+
+def store_job_listings(job, result_path, copied=(), complete=True):
+    """Upsert every listing of a finished job's result, LISTING_BATCH_SIZE rows at a time.
+
+    Price changes go to the price history; after a Revy portfolio run, listings
+    it no longer returned are marked removed. That is skipped unless `complete`,
+    a listing whose detail page failed is missing from the result but not gone.
+    """
+    now = datetime.utcnow()
+    stored = 0
+    chunks = pd.read_csv(result_path, dtype=str, keep_default_na=False, encoding='utf-8-sig',
+                         chunksize=LISTING_BATCH_SIZE)
+    for chunk in chunks:
+        rows = listing_batch(chunk, job.user_id, job.id, now, copied)
+        if not rows:
+            continue
+        before = stored_prices(job.user_id, [row['portal_id'] for row in rows])
+        record_observations(job.user_id, rows, upsert_listings(rows), before, now)
+        seen_set.add(job.user_id, [row['portal_id'] for row in rows])
+        stored += len(rows)
+    if job.url == REVY_LISTINGS_URL and complete:
+        mark_removed(job.user_id, now)
+    return stored
+
+
+def _stored_portal_ids(user_id):
+    query = db.session.query(Listing.portal_id).filter_by(user_id=user_id).yield_per(LISTING_BATCH_SIZE)
+    return (portal_id for portal_id, in query)
+
+
+class RecentListings:
+    """Rows that earlier jobs of a user already fetched, for a job to copy instead of opening the detail page.
+
+    The seen-set rules out new listings without a query. Hits are confirmed
+    on the listing table, where the detail page must have been fetched within
+    SEEN_MAX_AGE_HOURS (copies do not count), and the row is read from the
+    result of the job that last saw it when that result has the same columns.
+    `copied` collects the portal IDs handed out, for store_job_listings.
+    """
+
+    def __init__(self, user_id, fieldnames):
+        self.user_id = user_id
+        self.fieldnames = list(fieldnames)
+        self.enabled = SEEN_MAX_AGE_HOURS > 0
+        self._since = datetime.utcnow() - timedelta(hours=SEEN_MAX_AGE_HOURS)
+        # job id -> (result path, {listing key hash: row number}), None when unusable
+        self._sources = {}
+        self.copied = set()
+        if self.enabled:
+            seen_set.ensure(user_id, lambda: _stored_portal_ids(user_id))
+
+    def rows(self, links):
+        """{link: row} for the links whose listing needs no visit"""
+        if not self.enabled:
+            return {}
+        links_by_id = {}
+        for link in links:
+            portal_id = parse_portal_id(link)
+            if portal_id:
+                links_by_id[portal_id] = link
+        candidates = seen_set.maybe_seen(self.user_id, list(links_by_id))
+        # job id -> {row number in its result: portal id}, so each result is read once
+        wanted = defaultdict(dict)
+        for start in range(0, len(candidates), LISTING_BATCH_SIZE):
+            confirmed = db.session.query(Listing.portal_id, Listing.last_job_id).filter(
+                Listing.user_id == self.user_id,
+                Listing.portal_id.in_(candidates[start:start + LISTING_BATCH_SIZE]),
+                Listing.last_fetched_at >= self._since,
+                Listing.last_job_id.isnot(None)
+            )
+            for portal_id, job_id in confirmed:
+                source = self._source(job_id)
+                number = source[1].get(listing_key(links_by_id[portal_id])) if source else None
+                if number is not None:
+                    wanted[job_id][number] = portal_id
+        rows = {}
+        for job_id, numbers in wanted.items():
+            for number, row in read_row_numbers(self._sources[job_id][0], numbers).items():
+                portal_id = numbers[number]
+                rows[links_by_id[portal_id]] = dict(zip(self.fieldnames, row))
+                self.copied.add(portal_id)
+        return rows
+
+    def _source(self, job_id):
+        if job_id not in self._sources:
+            self._sources[job_id] = None
+            job = db.session.get(ScrapingJob, job_id)
+            if job and job.status == 'completed' and job.result and os.path.isfile(job.result):
+                columns, _, _ = read_rows(job.result, 0, 0)
+                if columns == self.fieldnames:
+                    hashes = read_hashes(job.result)
+                    self._sources[job_id] = (job.result, {hashes[i]: i // 2 for i in range(0, len(hashes), 2)})
+        return self._sources[job_id]
@@ -18,6 +18,8 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 import traceback
 import platform
+from job_control import LocalJobControl, WAITING_LOGIN, LOGIN_CONFIRMED, RUNNING, PAUSED, STOPPED
+from session_vault import SessionVault, whatsapp_logged_in
 from openai import OpenAI
 import json
 from config import OPENAI_API_KEY
@@ -139,29 +141,40 @@ class WhatsAppBotThread(QThread):
         self.test_phone = test_phone
         self.selected_templates = selected_templates
         self.custom_template = custom_template
-        self.manual_confirmation = False
         self.driver = None
-        self.is_paused = False
-        self.should_stop = False
-        self.should_start = False
+        self.control = LocalJobControl(WAITING_LOGIN)
+
+    @property
+    def is_paused(self):
+        return self.control.paused
+
+    @property
+    def should_stop(self):
+        return self.control.stopped
+
+    def confirm_login(self):
+        self.control.set_state(LOGIN_CONFIRMED)
 
     def pause(self):
-        self.is_paused = True
+        self.control.set_state(PAUSED)
         logging.info("WhatsApp bot duraklatıldı")
 
     def resume(self):
-        self.is_paused = False
+        self.control.set_state(RUNNING)
         logging.info("WhatsApp bot devam ediyor")
 
     def stop(self):
-        self.should_stop = True
+        self.control.set_state(STOPPED)
         logging.info("WhatsApp bot durduruluyor")
 
     def start_bot(self):
-        self.should_start = True
+        self.control.set_state(RUNNING)
         logging.info("WhatsApp bot başlatılıyor...")
 
     def run(self):
+        vault = SessionVault('whatsapp', 'desktop')
+        profile_dir = vault.open_profile()
+        logged_in = False
         try:
             # Logging sistemini kur
             self.log_file = setup_logging()
@@ -175,6 +188,8 @@ class WhatsAppBotThread(QThread):
             # Chrome'u başlat
             logging.info("Chrome başlatılıyor...")
             options = webdriver.ChromeOptions()
+            # WhatsApp oturumu şifreli profilde saklanır, QR tekrar okutulmaz
+            options.add_argument(f'--user-data-dir={profile_dir}')
             try:
                 # Apple Silicon için özel ayarlar
                 if sys.platform == 'darwin' and platform.machine() == 'arm64':
@@ -195,21 +210,22 @@ class WhatsAppBotThread(QThread):
             self.driver.get("https://web.whatsapp.com")
             logging.info("✅ Chrome başlatıldı ve WhatsApp Web sayfası açıldı.")
             
-            # Manuel onay sinyalini gönder
-            self.manual_confirmation_needed.emit()
-            
-            # Manuel onay bekleniyor
-            while not self.manual_confirmation:
-                self.msleep(100)  # 100ms bekle
-                if self.should_stop:
+            if whatsapp_logged_in(self.driver):
+                logging.info("✅ Kayıtlı WhatsApp oturumu kullanıldı.")
+                self.control.set_state(RUNNING)
+            else:
+                # Manuel onay sinyalini gönder
+                self.manual_confirmation_needed.emit()
+                
+                # Manuel onay bekleniyor
+                if self.control.wait_until(lambda state: state != WAITING_LOGIN) == STOPPED:
                     return
-            
-            # Başlatma sinyali bekleniyor
-            logging.info("❗ WhatsApp'a giriş yaptıktan sonra 'Başlat' butonuna tıklayın...")
-            while not self.should_start:
-                self.msleep(100)  # 100ms bekle
-                if self.should_stop:
+                
+                # Başlatma sinyali bekleniyor
+                logging.info("❗ WhatsApp'a giriş yaptıktan sonra 'Başlat' butonuna tıklayın...")
+                if self.control.wait_until(lambda state: state not in (WAITING_LOGIN, LOGIN_CONFIRMED)) == STOPPED:
                     return
+            logged_in = True
             
             # Bot'u çalıştır
             logging.info("WhatsApp bot başlatılıyor...")
@@ -233,6 +249,11 @@ class WhatsAppBotThread(QThread):
                     self.driver.quit()
                 except:
                     pass
+            try:
+                if logged_in:
+                    vault.save_profile(profile_dir)
+            finally:
+                vault.discard_profile(profile_dir)
             logging.info("WhatsApp bot işlemi sonlandı")
 
 class WhatsAppBotTab(QWidget):
@@ -587,7 +608,7 @@ class WhatsAppBotTab(QWidget):
         msg.setStandardButtons(QMessageBox.StandardButton.Ok)
         
         if msg.exec() == QMessageBox.StandardButton.Ok:
-            self.bot_thread.manual_confirmation = True
+            self.bot_thread.confirm_login()
             self.continue_button.setEnabled(True)
 
     def bot_finished(self):
@@ -0,0 +1,85 @@
+"""Measure the memory a scraping job holds per listing.
+
+Usage: python memory_benchmark.py [--listings N]
+
+Compares the old in-memory representation (a dict per listing with fresh
+strings, visited links as URL strings) with the current one (the column
+lists of ParquetResultWriter with interned categoricals, integer listing
+IDs). Records are measured for at most one row group. Sizes come from
+tracemalloc, so only Python allocations count.
+"""
+import argparse
+import os
+import random
+import tempfile
+import tracemalloc
+
+from columnar import ROW_GROUP_ROWS, ParquetResultWriter
+from results import listing_id
+
+FIELDS = ['Ilan Basligi', 'IslemTipi', 'Cinsi', 'Turu', 'Bolge', 'IlanSahibi', 'Telefon', 'Fiyat',
+          'IlanTarihi', 'Ilan Kaynağı', 'Ilan Linki']
+CATEGORIES = {
+    'IslemTipi': ['Satılık', 'Kiralık'],
+    'Cinsi': ['Daire', 'Villa', 'Müstakil Ev', 'Residence', 'Arsa', 'Dükkan'],
+    'Turu': ['Konut', 'İş Yeri', 'Arsa'],
+    'Bolge': [f'İstanbul Kadıköy Mahalle {i}' for i in range(300)],
+    'IlanSahibi': ['Sahibinden', 'Emlak Ofisinden'],
+    'Ilan Kaynağı': ['sahibinden.com', 'hepsiemlak.com', 'emlakjet.com'],
+}
+
+
+def _fresh(text):
+    # Selenium returns a new string object for every element text
+    return text.encode('utf-8').decode('utf-8')
+
+
+def make_listing(i, rng):
+    row = {field: _fresh(rng.choice(values)) for field, values in CATEGORIES.items()}
+    row['Ilan Basligi'] = _fresh(f'{rng.choice(CATEGORIES["Cinsi"])} {rng.randint(1, 5)}+1 ilan {i} metroya yakın')
+    row['Telefon'] = _fresh(f'0532 {rng.randint(100, 999)} {rng.randint(10, 99)} {rng.randint(10, 99)}')
+    row['Fiyat'] = _fresh(f'{rng.randint(500, 20000) * 1000:,} TL'.replace(',', '.'))
+    row['IlanTarihi'] = _fresh(f'{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.2024')
+    row['Ilan Linki'] = _fresh(f'https://www.revy.com.tr/app/portfoy/detay/{1000000 + i}')
+    return row
+
+
+def measure(target, add, listings):
+    """Bytes per listing that `target` holds after add(target, row) for every listing"""
+    rng = random.Random(1)
+    tracemalloc.start()
+    try:
+        for i in range(listings):
+            add(target, make_listing(i, rng))
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return size / listings
+
+
+def compare(listings):
+    # Records stay in memory until a row group is written
+    records = min(listings, ROW_GROUP_ROWS - 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = ParquetResultWriter(os.path.join(tmp, 'benchmark.parquet'), FIELDS)
+        try:
+            yield ('records', measure([], list.append, records),
+                   measure(writer, ParquetResultWriter.write, records))
+        finally:
+            writer.discard()
+    yield ('visited links', measure(set(), lambda links, row: links.add(row['Ilan Linki']), listings),
+           measure(set(), lambda links, row: links.add(listing_id(row['Ilan Linki'])), listings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--listings', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'structure':<20} {'before B/listing':>17} {'after B/listing':>16}")
+    for name, old, new in compare(args.listings):
+        print(f"{name:<20} {old:>17.0f} {new:>16.0f}  ({(1 - new / old) * 100:.0f}% less)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""job indexes and user_job_stats
+
+Revision ID: 3f1d2c7a9b4e
+Revises: 8a2c1176efcb
+Create Date: 2026-10-19 10:12:31.418112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1d2c7a9b4e'
+down_revision = '8a2c1176efcb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scraping_job', schema=None) as batch_op:
+        batch_op.create_index('ix_scraping_job_user_id_created_at', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_scraping_job_user_id_status', ['user_id', 'status'], unique=False)
+
+    op.create_table('user_job_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_jobs', sa.Integer(), nullable=False),
+    sa.Column('completed_jobs', sa.Integer(), nullable=False),
+    sa.Column('failed_jobs', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Backfill the summary rows with one pass over the existing jobs
+    op.execute(
+        "INSERT INTO user_job_stats (user_id, total_jobs, completed_jobs, failed_jobs, updated_at) "
+        "SELECT user_id, COUNT(id), "
+        "SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END), "
+        "CURRENT_TIMESTAMP "
+        "FROM scraping_job GROUP BY user_id"
+    )
+
+
+def downgrade():
+    op.drop_table('user_job_stats')
+
+    with op.batch_alter_table('scraping_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_scraping_job_user_id_status')
+        batch_op.drop_index('ix_scraping_job_user_id_created_at')
@@ -0,0 +1,32 @@
+"""scraping_job keyset indexes
+
+Revision ID: 5e9b3f0c8d61
+Revises: d41c6e8f7a23
+Create Date: 2026-10-19 16:04:52.771203
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5e9b3f0c8d61'
+down_revision = 'd41c6e8f7a23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The wider indexes keep the old ones as prefixes, so those are dropped
+    with op.batch_alter_table('scraping_job', schema=None) as batch_op:
+        batch_op.create_index('ix_scraping_job_user_id_created_at_id', ['user_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_scraping_job_user_id_status_created_at_id', ['user_id', 'status', 'created_at', 'id'], unique=False)
+        batch_op.drop_index('ix_scraping_job_user_id_created_at')
+        batch_op.drop_index('ix_scraping_job_user_id_status')
+
+
+def downgrade():
+    with op.batch_alter_table('scraping_job', schema=None) as batch_op:
+        batch_op.create_index('ix_scraping_job_user_id_status', ['user_id', 'status'], unique=False)
+        batch_op.create_index('ix_scraping_job_user_id_created_at', ['user_id', 'created_at'], unique=False)
+        batch_op.drop_index('ix_scraping_job_user_id_status_created_at_id')
+        batch_op.drop_index('ix_scraping_job_user_id_created_at_id')
@@ -0,0 +1,52 @@
+"""listing
+
+Revision ID: a3c8e5f17b92
+Revises: 5e9b3f0c8d61
+Create Date: 2026-10-19 18:12:40.318520
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c8e5f17b92'
+down_revision = '5e9b3f0c8d61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('listing',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('portal_id', sa.String(length=64), nullable=False),
+    sa.Column('url', sa.String(length=500), nullable=False),
+    sa.Column('title', sa.String(length=500), nullable=True),
+    sa.Column('transaction_type', sa.String(length=50), nullable=True),
+    sa.Column('property_type', sa.String(length=100), nullable=True),
+    sa.Column('category', sa.String(length=100), nullable=True),
+    sa.Column('region', sa.String(length=255), nullable=True),
+    sa.Column('owner', sa.String(length=255), nullable=True),
+    sa.Column('price', sa.String(length=100), nullable=True),
+    sa.Column('listed_on', sa.String(length=50), nullable=True),
+    sa.Column('phone', sa.String(length=50), nullable=True),
+    sa.Column('first_seen_at', sa.DateTime(), nullable=True),
+    sa.Column('last_seen_at', sa.DateTime(), nullable=True),
+    sa.Column('last_job_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['last_job_id'], ['scraping_job.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'portal_id', name='uq_listing_user_id_portal_id')
+    )
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.create_index('ix_listing_user_id_last_seen_at', ['user_id', 'last_seen_at'], unique=False)
+        batch_op.create_index('ix_listing_user_id_region', ['user_id', 'region'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.drop_index('ix_listing_user_id_region')
+        batch_op.drop_index('ix_listing_user_id_last_seen_at')
+
+    op.drop_table('listing')
@@ -0,0 +1,28 @@
+"""scraping_job batch_id
+
+Revision ID: b7e4a91c2d05
+Revises: 3f1d2c7a9b4e
+Create Date: 2026-10-19 14:02:47.530921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e4a91c2d05'
+down_revision = '3f1d2c7a9b4e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scraping_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('batch_id', sa.String(length=36), nullable=True))
+        batch_op.create_index('ix_scraping_job_batch_id', ['batch_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('scraping_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_scraping_job_batch_id')
+        batch_op.drop_column('batch_id')
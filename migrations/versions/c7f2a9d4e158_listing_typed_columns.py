@@ -0,0 +1,42 @@
+"""listing typed columns
+
+Revision ID: c7f2a9d4e158
+Revises: a3c8e5f17b92
+Create Date: 2026-10-19 19:02:17.904611
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7f2a9d4e158'
+down_revision = 'a3c8e5f17b92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('price_amount', sa.Numeric(precision=14, scale=2), nullable=True))
+        batch_op.add_column(sa.Column('currency', sa.String(length=3), nullable=True))
+        batch_op.add_column(sa.Column('listed_date', sa.Date(), nullable=True))
+        batch_op.add_column(sa.Column('city', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('district', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('neighborhood', sa.String(length=150), nullable=True))
+        batch_op.add_column(sa.Column('phone_e164', sa.String(length=16), nullable=True))
+        batch_op.create_index('ix_listing_user_id_price_amount', ['user_id', 'price_amount'], unique=False)
+        batch_op.create_index('ix_listing_user_id_city_district', ['user_id', 'city', 'district'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.drop_index('ix_listing_user_id_city_district')
+        batch_op.drop_index('ix_listing_user_id_price_amount')
+        batch_op.drop_column('phone_e164')
+        batch_op.drop_column('neighborhood')
+        batch_op.drop_column('district')
+        batch_op.drop_column('city')
+        batch_op.drop_column('listed_date')
+        batch_op.drop_column('currency')
+        batch_op.drop_column('price_amount')
@@ -0,0 +1,37 @@
+"""webhook
+
+Revision ID: d41c6e8f7a23
+Revises: b7e4a91c2d05
+Create Date: 2026-10-19 15:21:09.184467
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41c6e8f7a23'
+down_revision = 'b7e4a91c2d05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('webhook',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('url', sa.String(length=500), nullable=False),
+    sa.Column('secret', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('webhook', schema=None) as batch_op:
+        batch_op.create_index('ix_webhook_user_id', ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('webhook', schema=None) as batch_op:
+        batch_op.drop_index('ix_webhook_user_id')
+
+    op.drop_table('webhook')
@@ -0,0 +1,49 @@
+"""listing price history
+
+Revision ID: e2b6d8f3a901
+Revises: c7f2a9d4e158
+Create Date: 2026-10-19 19:48:31.226094
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6d8f3a901'
+down_revision = 'c7f2a9d4e158'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('listing_price_history',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('listing_id', sa.Integer(), nullable=False),
+    sa.Column('observed_at', sa.DateTime(), nullable=False),
+    sa.Column('price_amount', sa.Numeric(precision=14, scale=2), nullable=True),
+    sa.Column('previous_amount', sa.Numeric(precision=14, scale=2), nullable=True),
+    sa.Column('currency', sa.String(length=3), nullable=True),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.ForeignKeyConstraint(['listing_id'], ['listing.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('listing_price_history', schema=None) as batch_op:
+        batch_op.create_index('ix_listing_price_history_listing_id_observed_at', ['listing_id', 'observed_at'], unique=False)
+        batch_op.create_index('ix_listing_price_history_user_id_observed_at_id', ['user_id', 'observed_at', 'id'], unique=False)
+
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=10), server_default='active', nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.drop_column('status')
+
+    with op.batch_alter_table('listing_price_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_listing_price_history_user_id_observed_at_id')
+        batch_op.drop_index('ix_listing_price_history_listing_id_observed_at')
+
+    op.drop_table('listing_price_history')
@@ -0,0 +1,26 @@
+"""listing last_fetched_at
+
+Revision ID: f8d3b6a2c417
+Revises: e2b6d8f3a901
+Create Date: 2026-10-20 10:12:44.508317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8d3b6a2c417'
+down_revision = 'e2b6d8f3a901'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_fetched_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.drop_column('last_fetched_at')
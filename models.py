@@ -0,0 +1,173 @@
+import hashlib
+import os
+from datetime import datetime
+from flask import g
+from flask_login import UserMixin
+from extensions import db, login_manager, redis_client, user_cache, api_key_cache
+
+API_KEY_CACHE_TTL = int(os.getenv('API_KEY_CACHE_TTL', 300))
+# Unknown keys, in both the process and the Redis tier so a new key works everywhere at once
+API_KEY_NEGATIVE_TTL = 60
+
+# Models
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password = db.Column(db.String(200), nullable=False)
+    subscription_tier = db.Column(db.String(20), default='free')
+    subscription_status = db.Column(db.String(20), default='active')
+    subscription_end = db.Column(db.DateTime)
+    stripe_customer_id = db.Column(db.String(100))
+    shopier_customer_id = db.Column(db.String(100))
+    api_key = db.Column(db.String(100), unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ScrapingJob(db.Model):
+    __table_args__ = (
+        # id is the keyset tie-breaker of /api/jobs, so both listings stay index-ordered
+        db.Index('ix_scraping_job_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        db.Index('ix_scraping_job_user_id_status_created_at_id', 'user_id', 'status', 'created_at', 'id'),
+        db.Index('ix_scraping_job_batch_id', 'batch_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    url = db.Column(db.String(500), nullable=False)
+    template_id = db.Column(db.Integer, db.ForeignKey('template.id'))
+    status = db.Column(db.String(20), default='pending')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+    result = db.Column(db.Text)
+    batch_id = db.Column(db.String(36))
+
+class UserJobStats(db.Model):
+    __tablename__ = 'user_job_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    total_jobs = db.Column(db.Integer, nullable=False, default=0)
+    completed_jobs = db.Column(db.Integer, nullable=False, default=0)
+    failed_jobs = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Webhook(db.Model):
+    __table_args__ = (
+        db.Index('ix_webhook_user_id', 'user_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    url = db.Column(db.String(500), nullable=False)
+    secret = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Listing(db.Model):
+    """A portal listing as last scraped by a user, one row per portal listing ID"""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'portal_id', name='uq_listing_user_id_portal_id'),
+        db.Index('ix_listing_user_id_last_seen_at', 'user_id', 'last_seen_at'),
+        db.Index('ix_listing_user_id_region', 'user_id', 'region'),
+        db.Index('ix_listing_user_id_price_amount', 'user_id', 'price_amount'),
+        db.Index('ix_listing_user_id_city_district', 'user_id', 'city', 'district'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    portal_id = db.Column(db.String(64), nullable=False)
+    url = db.Column(db.String(500), nullable=False)
+    title = db.Column(db.String(500))
+    transaction_type = db.Column(db.String(50))
+    property_type = db.Column(db.String(100))
+    category = db.Column(db.String(100))
+    region = db.Column(db.String(255))
+    owner = db.Column(db.String(255))
+    price = db.Column(db.String(100))
+    listed_on = db.Column(db.String(50))
+    phone = db.Column(db.String(50))
+    # Typed copies of the raw fields above, filled by cleaning.clean_listings
+    price_amount = db.Column(db.Numeric(14, 2))
+    currency = db.Column(db.String(3))
+    listed_date = db.Column(db.Date)
+    city = db.Column(db.String(100))
+    district = db.Column(db.String(100))
+    neighborhood = db.Column(db.String(150))
+    phone_e164 = db.Column(db.String(16))
+    # 'removed' once a Revy portfolio run no longer lists it
+    status = db.Column(db.String(10), default='active')
+    first_seen_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Last time the detail page was opened; rows copied from an earlier result leave it alone
+    last_fetched_at = db.Column(db.DateTime)
+    last_job_id = db.Column(db.Integer, db.ForeignKey('scraping_job.id', ondelete='SET NULL'))
+
+class ListingPriceHistory(db.Model):
+    """Append-only price observations; a row is only written when price or status changes"""
+    __tablename__ = 'listing_price_history'
+    __table_args__ = (
+        db.Index('ix_listing_price_history_user_id_observed_at_id', 'user_id', 'observed_at', 'id'),
+        db.Index('ix_listing_price_history_listing_id_observed_at', 'listing_id', 'observed_at'),
+    )
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    listing_id = db.Column(db.Integer, db.ForeignKey('listing.id', ondelete='CASCADE'), nullable=False)
+    observed_at = db.Column(db.DateTime, nullable=False)
+    price_amount = db.Column(db.Numeric(14, 2))
+    # Price of the listing's previous row, so a change is readable without a self-join
+    previous_amount = db.Column(db.Numeric(14, 2))
+    currency = db.Column(db.String(3))
+    status = db.Column(db.String(10), nullable=False)
+
+class Template(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text)
+    content = db.Column(db.Text, nullable=False)
+    is_premium = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    user = user_cache.get(user_id)
+    if user is None:
+        user = User.query.get(user_id)
+        if user is None:
+            return None
+        # Keep a detached copy so commits in later requests cannot expire it
+        db.session.expunge(user)
+        user_cache.set(user_id, user)
+    return db.session.merge(user, load=False)
+
+def api_key_from_request(request):
+    key = request.headers.get('X-API-Key')
+    if not key:
+        auth = request.headers.get('Authorization', '')
+        if auth.startswith('Bearer '):
+            key = auth[7:].strip()
+    return key or None
+
+def lookup_api_key(key):
+    """Resolve an API key to a user id: process cache, then Redis, then the database"""
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    user_id = api_key_cache.get(digest)
+    if user_id is None:
+        cached = redis_client.get(f'apikey:{digest}')
+        if cached is not None:
+            user_id = int(cached)
+        else:
+            user_id = db.session.query(User.id).filter_by(api_key=key).scalar() or 0
+            # Unknown keys (0) are remembered briefly so guessing cannot hammer the database
+            redis_client.set(f'apikey:{digest}', user_id, ex=API_KEY_CACHE_TTL if user_id else API_KEY_NEGATIVE_TTL)
+        api_key_cache.set(digest, user_id, None if user_id else API_KEY_NEGATIVE_TTL)
+    return digest, user_id or None
+
+@login_manager.request_loader
+def load_user_from_request(request):
+    """API clients authenticate /api/* calls with an X-API-Key or Bearer header instead of a session"""
+    if not request.path.startswith('/api/'):
+        return None
+    key = api_key_from_request(request)
+    if not key:
+        return None
+    digest, user_id = lookup_api_key(key)
+    if not user_id:
+        return None
+    user = load_user(user_id)
+    if user is not None:
+        g.api_key_digest = digest
+    return user
@@ -0,0 +1,33 @@
+import os
+
+API_RATE_LIMIT = int(os.getenv('API_RATE_LIMIT', 600))
+
+
+def get_subscription_limits(tier):
+    limits = {
+        'free': {
+            'daily_jobs': 10,
+            'templates': ['basic'],
+            'export_formats': ['csv'],
+            'api_requests_per_minute': 0,
+            'result_retention_days': 7,
+            'storage_quota_mb': 200
+        },
+        'pro': {
+            'daily_jobs': 100,
+            'templates': ['basic', 'premium'],
+            'export_formats': ['csv', 'json', 'excel', 'parquet'],
+            'api_requests_per_minute': 0,
+            'result_retention_days': 30,
+            'storage_quota_mb': 2048
+        },
+        'enterprise': {
+            'daily_jobs': float('inf'),
+            'templates': ['basic', 'premium', 'custom'],
+            'export_formats': ['csv', 'json', 'excel', 'parquet'],
+            'api_requests_per_minute': API_RATE_LIMIT,
+            'result_retention_days': 90,
+            'storage_quota_mb': 20480
+        }
+    }
+    return limits.get(tier, limits['free'])
@@ -0,0 +1,126 @@
+from decimal import Decimal
+from sqlalchemy import insert, tuple_, update
+from extensions import db
+from models import Listing, ListingPriceHistory, ScrapingJob
+from jobs import REVY_LISTINGS_URL, encode_job_cursor, decode_job_cursor
+
+CHUNK_SIZE = 1000
+
+
+def _decimal(value):
+    return None if value is None else Decimal(str(round(value, 2)))
+
+
+def stored_prices(user_id, portal_ids):
+    """{portal_id: (price_amount, currency, status)} of the listings already stored"""
+    rows = db.session.query(Listing.portal_id, Listing.price_amount, Listing.currency, Listing.status).filter(
+        Listing.user_id == user_id,
+        Listing.portal_id.in_(portal_ids)
+    )
+    return {portal_id: (amount, currency, status) for portal_id, amount, currency, status in rows}
+
+
+def record_observations(user_id, rows, listing_ids, before, observed_at):
+    """Append a history row for listings that are new, came back or changed price.
+
+    `before` is stored_prices() from before the upsert. Unchanged observations
+    are not written, so the table grows with changes rather than with runs.
+    """
+    history = []
+    for row in rows:
+        amount = _decimal(row.get('price_amount'))
+        previous_amount, previous_currency, previous_status = before.get(row['portal_id'], (None, None, None))
+        currency = row.get('currency') or previous_currency
+        if row['portal_id'] in before and previous_status == 'active':
+            if amount is None or (amount, currency) == (previous_amount, previous_currency):
+                continue
+        history.append({
+            'user_id': user_id,
+            'listing_id': listing_ids[row['portal_id']],
+            'observed_at': observed_at,
+            'price_amount': amount if amount is not None else previous_amount,
+            'previous_amount': previous_amount,
+            'currency': currency,
+            'status': 'active'
+        })
+    if history:
+        db.session.execute(insert(ListingPriceHistory), history)
+    return len(history)
+
+
+def mark_removed(user_id, observed_at):
+    """Listings the previous Revy portfolio runs saw but the one at `observed_at` did not"""
+    gone = db.session.query(Listing.id, Listing.price_amount, Listing.currency) \
+        .join(ScrapingJob, ScrapingJob.id == Listing.last_job_id) \
+        .filter(Listing.user_id == user_id, Listing.status == 'active', Listing.last_seen_at < observed_at,
+                ScrapingJob.url == REVY_LISTINGS_URL).all()
+    for start in range(0, len(gone), CHUNK_SIZE):
+        chunk = gone[start:start + CHUNK_SIZE]
+        db.session.execute(update(Listing).where(Listing.id.in_([row.id for row in chunk])).values(status='removed'))
+        db.session.execute(insert(ListingPriceHistory), [{
+            'user_id': user_id,
+            'listing_id': row.id,
+            'observed_at': observed_at,
+            'price_amount': row.price_amount,
+            'previous_amount': row.price_amount,
+            'currency': row.currency,
+            'status': 'removed'
+        } for row in chunk])
+    return len(gone)
+
+
+def get_price_changes(user_id, since, until, direction=None, cursor=None, limit=50):
+    """Price changes observed in [since, until), newest first, keyset-paginated on (observed_at, id).
+
+    Every history row carries the previous price, so this is one range scan of
+    ix_listing_price_history_user_id_observed_at_id. Returns (changes, next cursor or None).
+    """
+    history = ListingPriceHistory
+    query = db.session.query(history, Listing.portal_id, Listing.title, Listing.url) \
+        .join(Listing, Listing.id == history.listing_id) \
+        .filter(history.user_id == user_id, history.observed_at >= since, history.observed_at < until,
+                history.status == 'active', history.previous_amount.isnot(None),
+                history.price_amount != history.previous_amount)
+    if direction == 'down':
+        query = query.filter(history.price_amount < history.previous_amount)
+    elif direction == 'up':
+        query = query.filter(history.price_amount > history.previous_amount)
+    if cursor:
+        observed_at, history_id = decode_job_cursor(cursor)
+        query = query.filter(tuple_(history.observed_at, history.id) < tuple_(observed_at, history_id))
+    rows = query.order_by(history.observed_at.desc(), history.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1][0]
+        next_cursor = encode_job_cursor(last.observed_at, last.id)
+    changes = []
+    for entry, portal_id, title, url in rows[:limit]:
+        change = entry.price_amount - entry.previous_amount
+        changes.append({
+            'listing_id': entry.listing_id,
+            'portal_id': portal_id,
+            'title': title,
+            'url': url,
+            'observed_at': entry.observed_at.isoformat(),
+            'price': float(entry.price_amount),
+            'previous_price': float(entry.previous_amount),
+            'currency': entry.currency,
+            'change': float(change),
+            'change_pct': round(float(change / entry.previous_amount * 100), 2) if entry.previous_amount else None
+        })
+    return changes, next_cursor
+
+
+def get_listing_history(user_id, listing_id):
+    """Full series of one listing, oldest first; None when the listing is not the user's"""
+    listing = db.session.query(Listing.id).filter_by(id=listing_id, user_id=user_id).first()
+    if listing is None:
+        return None
+    rows = ListingPriceHistory.query.filter_by(listing_id=listing_id) \
+        .order_by(ListingPriceHistory.observed_at, ListingPriceHistory.id).all()
+    return [{
+        'observed_at': row.observed_at.isoformat(),
+        'price': float(row.price_amount) if row.price_amount is not None else None,
+        'currency': row.currency,
+        'status': row.status
+    } for row in rows]
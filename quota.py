@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+# Check-and-increment in one round trip. Returns the new count, -1 when the
+# counter has not been seeded yet and -2 when the limit would be exceeded.
+_CONSUME_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return -1
+end
+local limit = tonumber(ARGV[1])
+local amount = tonumber(ARGV[2])
+if limit >= 0 and tonumber(current) + amount > limit then
+    return -2
+end
+return redis.call('INCRBY', KEYS[1], amount)
+"""
+
+
+def _seconds_until_midnight(now):
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return max(int((midnight - now).total_seconds()), 1)
+
+
+class DailyQuota:
+    """Per-user daily job counters kept in Redis.
+
+    Counters live under quota:<user_id>:<YYYY-MM-DD> (UTC, like the job
+    timestamps) and expire at midnight. A missing counter is seeded from the
+    database, so Redis restarts or evictions reconcile themselves.
+    """
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self._consume = redis_client.register_script(_CONSUME_SCRIPT)
+
+    def _key(self, user_id, now):
+        return f'quota:{user_id}:{now.date().isoformat()}'
+
+    def _seed(self, key, now, count_from_db):
+        # NX keeps a counter another request seeded in the meantime
+        self.redis.set(key, count_from_db(), nx=True, ex=_seconds_until_midnight(now))
+
+    def usage(self, user_id, count_from_db):
+        now = datetime.utcnow()
+        key = self._key(user_id, now)
+        current = self.redis.get(key)
+        if current is None:
+            self._seed(key, now, count_from_db)
+            current = self.redis.get(key)
+        return int(current or 0)
+
+    def consume(self, user_id, limit, count_from_db, amount=1):
+        """Reserve `amount` jobs for today; returns (allowed, count after the call)"""
+        now = datetime.utcnow()
+        key = self._key(user_id, now)
+        script_limit = -1 if limit == float('inf') else int(limit)
+        for _ in range(2):
+            result = self._consume(keys=[key], args=[script_limit, amount])
+            if result == -1:
+                self._seed(key, now, count_from_db)
+                continue
+            if result == -2:
+                return False, self.usage(user_id, count_from_db)
+            return True, int(result)
+        return False, self.usage(user_id, count_from_db)
+
+    def release(self, user_id, amount=1):
+        """Give back a reservation whose job could not be created"""
+        key = self._key(user_id, datetime.utcnow())
+        if self.redis.exists(key):
+            self.redis.decrby(key, amount)
+
+    def reconcile(self, user_id, count_from_db):
+        """Reset today's counter from the database"""
+        now = datetime.utcnow()
+        self.redis.set(self._key(user_id, now), count_from_db(), ex=_seconds_until_midnight(now))
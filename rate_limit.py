@@ -0,0 +1,41 @@
+import math
+import uuid
+
+# Sliding-window log in one round trip: drop entries older than the window,
+# then admit the request only while fewer than `limit` remain. Uses the Redis
+# clock so every web worker sees the same window. Returns
+# {allowed, count, milliseconds until the oldest entry leaves the window}.
+_HIT_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return {1, count + 1, 0}
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, count, tonumber(oldest[2]) + window - now}
+"""
+
+
+class SlidingWindowLimiter:
+    """Per-key request limits over a sliding time window, kept in Redis sorted sets"""
+
+    def __init__(self, redis_client, prefix='ratelimit'):
+        self.redis = redis_client
+        self.prefix = prefix
+        self._hit = redis_client.register_script(_HIT_SCRIPT)
+
+    def hit(self, key, limit, window_seconds=60):
+        """Record one request; returns (allowed, remaining, retry_after in seconds)"""
+        allowed, count, retry_ms = self._hit(
+            keys=[f'{self.prefix}:{key}'],
+            args=[window_seconds * 1000, limit, uuid.uuid4().hex]
+        )
+        if allowed:
+            return True, max(limit - int(count), 0), 0
+        return False, 0, max(math.ceil(int(retry_ms) / 1000), 1)
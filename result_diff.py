@@ -0,0 +1,57 @@
+import csv
+from results import open_result, read_hashes
+
+
+def _table(hashes):
+    # A listing that appears twice in a result counts with its last row
+    return {hashes[i]: (i // 2, hashes[i + 1]) for i in range(0, len(hashes), 2)}
+
+
+def _rows(path, numbers):
+    """(row number, row as dict) for the given row numbers of a result, in file order"""
+    with open_result(path) as f:
+        reader = csv.reader(f)
+        columns = next(reader, [])
+        for number, row in enumerate(reader):
+            if number in numbers:
+                yield number, dict(zip(columns, row))
+
+
+class ResultDiff:
+    """Added, removed and changed listings from one job result to another.
+
+    Rows are matched on their key hash and compared on their content hash, both
+    written with the result (see results.row_hasher), so the join only touches
+    two dicts of integers. Iterating reads each CSV once and only builds the
+    rows that differ; removed listings come first, then added and changed
+    ones in the order of the new result.
+    """
+
+    def __init__(self, old_path, new_path):
+        self.old_path = old_path
+        self.new_path = new_path
+        old = _table(read_hashes(old_path))
+        new = _table(read_hashes(new_path))
+        self._removed = {number for key, (number, _) in old.items() if key not in new}
+        self._added = {number for key, (number, _) in new.items() if key not in old}
+        # Row number in the new result -> row number of the same listing in the old one
+        self._changed = {number: old[key][0] for key, (number, content) in new.items()
+                         if key in old and old[key][1] != content}
+        self.counts = {'added': len(self._added), 'removed': len(self._removed), 'changed': len(self._changed)}
+
+    def __iter__(self):
+        old_numbers = set(self._changed.values())
+        old_rows = {}
+        for number, row in _rows(self.old_path, self._removed | old_numbers):
+            if number in self._removed:
+                yield {'type': 'removed', 'row': row}
+            else:
+                old_rows[number] = row
+        for number, row in _rows(self.new_path, self._added | self._changed.keys()):
+            if number in self._added:
+                yield {'type': 'added', 'row': row}
+            else:
+                old_row = old_rows.pop(self._changed[number])
+                changes = {column: [old_row.get(column), value] for column, value in row.items()
+                           if old_row.get(column) != value}
+                yield {'type': 'changed', 'row': row, 'changes': changes}
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import re
+
+MAX_QUERY_ROWS = 1000
+FILTER_OPS = {'=': '=', '!=': '<>', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+AGGREGATES = {'count': 'count({})', 'count_distinct': 'count(DISTINCT {})', 'sum': 'sum({})',
+              'avg': 'avg({})', 'min': 'min({})', 'max': 'max({})'}
+NUMERIC_AGGREGATES = ('sum', 'avg', 'min', 'max')
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _numeric(column):
+    # Prices are stored as scraped ("12.500,50 TL"); parse_price() is cleaning.clean_price, see run_query
+    return f'parse_price({_quote(column)})'
+
+
+def _parse_price(values):
+    import pyarrow as pa
+    from cleaning import clean_price
+
+    amount, _ = clean_price(values.to_pandas())
+    return pa.Array.from_pandas(amount, type=pa.float64())
+
+
+def _items(spec, key, types=(dict,)):
+    items = spec.get(key) or []
+    if not isinstance(items, list) or not all(isinstance(item, types) for item in items):
+        raise ValueError(f'{key} must be a list')
+    return items
+
+
+def query_key(job_id, spec):
+    digest = hashlib.sha256(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+    return f'query:{job_id}:{digest}'
+
+
+def build_query(spec, columns):
+    """SQL for a query spec over the `result` view; raises ValueError on an invalid spec.
+
+    spec = {"filters": [{"column": "Bolge", "op": "=", "value": "Kadıköy"},
+                        {"column": "Fiyat", "op": "between", "value": [1000000, 2000000]}],
+            "group_by": ["Cinsi"], "aggregates": [{"fn": "count"}, {"fn": "avg", "column": "Fiyat"}],
+            "sort": [{"column": "Fiyat", "desc": true}], "columns": [...], "limit": 100, "offset": 0}
+
+    <, <=, >, >=, between, sum, avg, min and max (and sort with "numeric": true)
+    treat column values as prices parsed like the listing table (NULL when not a number).
+    Column names are checked against the result, values are bound parameters.
+    """
+    def column_of(item, key='column'):
+        column = item.get(key) if isinstance(item, dict) else item
+        if column not in columns:
+            raise ValueError(f'Unknown column: {column}')
+        return column
+
+    where = []
+    params = []
+    for f in _items(spec, 'filters'):
+        column, op, value = column_of(f), f.get('op', '='), f.get('value')
+        if op in ('=', '!='):
+            where.append(f'{_quote(column)} {FILTER_OPS[op]} ?')
+            params.append(str(value))
+        elif op in FILTER_OPS:
+            where.append(f'{_numeric(column)} {FILTER_OPS[op]} ?')
+            params.append(_number(value))
+        elif op == 'between':
+            if not isinstance(value, list) or len(value) != 2:
+                raise ValueError('between needs a [low, high] value')
+            where.append(f'{_numeric(column)} BETWEEN ? AND ?')
+            params.extend(_number(v) for v in value)
+        elif op == 'in':
+            if not isinstance(value, list) or not value:
+                raise ValueError('in needs a non-empty list value')
+            where.append(f"{_quote(column)} IN ({', '.join('?' * len(value))})")
+            params.extend(str(v) for v in value)
+        elif op == 'contains':
+            # % and _ in the value are matched literally
+            where.append(f"{_quote(column)} ILIKE '%' || ? || '%' ESCAPE '\\'")
+            params.append(re.sub(r'([\\%_])', r'\\\1', str(value)))
+        else:
+            raise ValueError(f'Unknown filter op: {op}')
+    where_sql = f" WHERE {' AND '.join(where)}" if where else ''
+
+    group_by = [column_of(c) for c in _items(spec, 'group_by', (str,))]
+    if group_by:
+        select = [_quote(c) for c in group_by]
+        names = list(group_by)
+        for a in _items(spec, 'aggregates') or [{'fn': 'count'}]:
+            fn = a.get('fn')
+            if fn not in AGGREGATES:
+                raise ValueError(f'Unknown aggregate: {fn}')
+            if fn == 'count' and not a.get('column'):
+                select.append('count(*)')
+                names.append('count')
+                continue
+            column = column_of(a)
+            expr = _numeric(column) if fn in NUMERIC_AGGREGATES else _quote(column)
+            select.append(AGGREGATES[fn].format(expr))
+            names.append(f'{fn}_{column}')
+        sortable = names
+    else:
+        names = [column_of(c) for c in _items(spec, 'columns', (str,)) or columns]
+        select = [_quote(c) for c in names]
+        sortable = columns
+
+    order = []
+    for s in _items(spec, 'sort', (dict, str)):
+        s = s if isinstance(s, dict) else {'column': s}
+        column = s.get('column')
+        if column not in sortable:
+            raise ValueError(f'Cannot sort by: {column}')
+        if group_by:
+            expr = str(names.index(column) + 1)
+        else:
+            expr = _quote(column)
+            if s.get('numeric'):
+                expr = _numeric(column)
+        order.append(f"{expr} {'DESC' if s.get('desc') else 'ASC'} NULLS LAST")
+    order_sql = f" ORDER BY {', '.join(order)}" if order else ''
+
+    try:
+        limit = min(max(int(spec.get('limit', 100)), 1), MAX_QUERY_ROWS)
+        offset = max(int(spec.get('offset', 0)), 0)
+    except (TypeError, ValueError):
+        raise ValueError('limit and offset must be integers')
+    group_sql = f" GROUP BY {', '.join(_quote(c) for c in group_by)}" if group_by else ''
+    sql = f"SELECT {', '.join(select)} FROM result{where_sql}{group_sql}{order_sql} LIMIT {limit} OFFSET {offset}"
+    count_sql = f'SELECT count(*) FROM (SELECT 1 FROM result{where_sql}{group_sql})'
+    return names, sql, count_sql, params
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Not a number: {value!r}')
+
+
+def run_query(parquet_file, spec):
+    """Run a query spec against a Parquet result with DuckDB; returns the response body"""
+    import duckdb
+    import pyarrow.parquet as pq
+
+    columns = pq.read_schema(parquet_file).names
+    names, sql, count_sql, params = build_query(spec, columns)
+    con = duckdb.connect()
+    try:
+        # The selected columns and the =, != and in filters are pushed down into the Parquet
+        # scan; numeric filters call the parse_price Python UDF on every scanned row
+        con.read_parquet(parquet_file).create_view('result')
+        con.create_function('parse_price', _parse_price, ['VARCHAR'], 'DOUBLE', type='arrow',
+                            null_handling='special')
+        rows = con.execute(sql, params).fetchall()
+        total = con.execute(count_sql, params).fetchone()[0]
+    finally:
+        con.close()
+    return {'columns': names, 'rows': [list(row) for row in rows], 'total': total}
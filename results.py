@@ -0,0 +1,299 @@
+import bisect
+import csv
+import glob
+import gzip
+import hashlib
+import io
+import itertools
+import mmap
+import os
+import re
+import time
+import zlib
+from array import array
+
+RESULTS_DIR = 'results'
+# Level 6 is within a few percent of level 9 on listing text at a fraction of the CPU
+COMPRESS_LEVEL = int(os.getenv('RESULT_COMPRESS_LEVEL', 6))
+# Also write a Parquet copy of job results for analytics consumers
+WRITE_PARQUET = os.getenv('RESULT_PARQUET', '1') == '1'
+# Rows per independently decompressible block of a result file
+INDEX_BLOCK_ROWS = 500
+GZIP_WBITS = zlib.MAX_WBITS | 16
+LINK_COLUMNS = ('Ilan Linki', 'Link')
+PORTAL_ID_RE = re.compile(r'/app/portfoy/detay/([^/?#]+)')
+
+
+def job_result_path(job_id):
+    return os.path.join(RESULTS_DIR, f'job_{job_id}.csv.gz')
+
+
+def whatsapp_result_path(task_id):
+    return os.path.join(RESULTS_DIR, f'whatsapp_results_{task_id}.csv.gz')
+
+
+def job_result_files(job_id):
+    """Every stored file of a job: the result and anything derived from it"""
+    return (glob.glob(os.path.join(RESULTS_DIR, f'job_{job_id}.*'))
+            + glob.glob(os.path.join(RESULTS_DIR, f'job_{job_id}_*')))
+
+
+def parse_portal_id(url):
+    """Portal listing ID from a /app/portfoy/detay/<id> link, None for other links"""
+    match = PORTAL_ID_RE.search(url or '')
+    return match.group(1) if match else None
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def listing_key(url):
+    """Hash identifying a listing across results: its portal ID, or the link itself"""
+    return _hash64(parse_portal_id(url) or url)
+
+
+def listing_id(url):
+    """Integer for sets of visited listings: the portal ID when it is numeric, else listing_key()"""
+    portal_id = parse_portal_id(url)
+    return int(portal_id) if portal_id and portal_id.isdecimal() else listing_key(url)
+
+
+def row_hasher(fieldnames):
+    """Function of a row's values (in `fieldnames` order) -> (listing key hash, content hash).
+
+    The key is the portal ID of the row's link, or the link itself; rows
+    without a link are only identified by their content.
+    """
+    link = next((fieldnames.index(c) for c in LINK_COLUMNS if c in fieldnames), None)
+
+    def hash_row(values):
+        texts = ['' if v is None else str(v) for v in values]
+        content = _hash64('\x1f'.join(texts))
+        url = texts[link] if link is not None and link < len(texts) else ''
+        return (listing_key(url) if url else content), content
+    return hash_row
+
+
+def mark_accessed(path):
+    """Record a download in the file's atime, which retention uses for LRU eviction"""
+    try:
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+    except OSError:
+        pass
+
+
+def open_result(path, mode='rt'):
+    """Open a result file for reading, compressed or not (results written before compression)"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8-sig' if 't' in mode else None)
+    return open(path, mode, encoding='utf-8-sig' if 't' in mode else None)
+
+
+class ResultWriter:
+    """Streams CSV rows into a gzip-compressed result file while a job runs.
+
+    Rows go to `<path>.part`, which only replaces `path` on close(), so a
+    half-written file is never served. With `parquet`, the same rows are also
+    written to a Parquet file next to it.
+
+    The gzip stream is fully flushed every INDEX_BLOCK_ROWS rows and the
+    compressed offset of each block goes to the `<path>.idx` sidecar, so
+    read_rows() can start decompressing at any block (see write_index).
+    The `<path>.hashes` sidecar holds the key and content hash of every row
+    for diffs between results (see row_hasher).
+    """
+
+    def __init__(self, path, fieldnames, parquet=WRITE_PARQUET):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.part_path = path + '.part'
+        self.fieldnames = list(fieldnames)
+        self.rows = 0
+        self._file = open(self.part_path, 'wb')
+        self._compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._buffer.write('\ufeff')  # BOM, so Excel opens the CSV as UTF-8
+        self._writer.writerow(self.fieldnames)
+        self._index = array('Q')
+        self._hash_row = row_hasher(self.fieldnames)
+        self._hashes = array('Q')
+        self._flush_block()
+        self._parquet = None
+        if parquet:
+            # pyarrow is only needed where results are written
+            from columnar import ParquetResultWriter, parquet_path
+            self._parquet = ParquetResultWriter(parquet_path(path), fieldnames)
+
+    def _flush_block(self):
+        self._file.write(self._compressor.compress(self._buffer.getvalue().encode('utf-8')))
+        self._file.write(self._compressor.flush(zlib.Z_FULL_FLUSH))
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._index.extend((self.rows, self._file.tell()))
+
+    def write(self, row):
+        values = [row.get(field, '') for field in self.fieldnames]
+        self._writer.writerow(values)
+        self._hashes.extend(self._hash_row(values))
+        if self._parquet:
+            self._parquet.write(row)
+        self.rows += 1
+        if self.rows % INDEX_BLOCK_ROWS == 0:
+            self._flush_block()
+
+    def close(self):
+        """Finish the file; returns the number of rows, an empty result leaves no file"""
+        if self._file.closed:
+            return self.rows
+        if self._buffer.tell():
+            self._flush_block()
+        self._file.write(self._compressor.flush())
+        self._file.close()
+        # Parquet first, so it is never older than the CSV it was written with
+        if self._parquet:
+            self._parquet.close()
+        if self.rows:
+            write_index(index_path(self.path), self._index)
+            write_index(hashes_path(self.path), self._hashes)
+            os.replace(self.part_path, self.path)
+        else:
+            os.remove(self.part_path)
+        return self.rows
+
+    def discard(self):
+        if self._parquet:
+            self._parquet.discard()
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+
+def index_path(path):
+    return path + '.idx'
+
+
+def hashes_path(path):
+    return path + '.hashes'
+
+
+def write_index(path, entries):
+    """Row-offset index: native uint64 pairs (first row of the block, compressed offset).
+
+    The first pair points after the header, the last one holds the row count.
+    """
+    part_path = path + '.part'
+    with open(part_path, 'wb') as f:
+        entries.tofile(f)
+    os.replace(part_path, path)
+
+
+def read_rows(path, offset, limit):
+    """Rows [offset, offset + limit) of a result; returns (columns, rows, total rows).
+
+    Indexed results only read and decompress the blocks that hold the page.
+    Others are scanned from the start.
+    """
+    try:
+        index_file = open(index_path(path), 'rb')
+    except FileNotFoundError:
+        return _scan_rows(path, offset, limit)
+    with index_file, mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        entries = memoryview(m).cast('Q')
+        try:
+            blocks = len(entries) // 2
+            total = entries[-2]
+            header_end = entries[1]
+            end = min(offset + limit, total)
+            first = bisect.bisect_right(range(blocks), offset, key=lambda i: entries[2 * i]) - 1
+            last = bisect.bisect_left(range(blocks), end, key=lambda i: entries[2 * i])
+            first_row, start_byte = entries[2 * first], entries[2 * first + 1]
+            end_byte = entries[2 * min(last, blocks - 1) + 1]
+        finally:
+            entries.release()
+
+    with open(path, 'rb') as f:
+        header = zlib.decompressobj(GZIP_WBITS).decompress(f.read(header_end))
+        columns = next(csv.reader(io.StringIO(header.decode('utf-8-sig'))))
+        if offset >= total:
+            return columns, [], total
+        f.seek(start_byte)
+        # Blocks start after a full flush, so they inflate as raw deflate data
+        text = zlib.decompressobj(-zlib.MAX_WBITS).decompress(f.read(end_byte - start_byte))
+    reader = csv.reader(io.StringIO(text.decode('utf-8')))
+    rows = list(itertools.islice(reader, offset - first_row, end - first_row))
+    return columns, rows, total
+
+
+def read_row_numbers(path, numbers):
+    """{row number: row} for the given row numbers of a result.
+
+    Indexed results decompress each block that holds a wanted row once,
+    others are scanned from the start.
+    """
+    numbers = sorted(set(numbers))
+    try:
+        index_file = open(index_path(path), 'rb')
+    except FileNotFoundError:
+        wanted = set(numbers)
+        with open_result(path) as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            return {number: row for number, row in enumerate(reader) if number in wanted}
+    # (first row, start byte, end byte, wanted row numbers) per block
+    spans = []
+    with index_file, mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        entries = memoryview(m).cast('Q')
+        try:
+            blocks = len(entries) // 2
+            for number in numbers:
+                if number >= entries[-2]:
+                    break
+                block = bisect.bisect_right(range(blocks), number, key=lambda i: entries[2 * i]) - 1
+                if spans and spans[-1][0] == entries[2 * block]:
+                    spans[-1][3].append(number)
+                else:
+                    spans.append((entries[2 * block], entries[2 * block + 1], entries[2 * block + 3], [number]))
+        finally:
+            entries.release()
+
+    rows = {}
+    with open(path, 'rb') as f:
+        for first_row, start_byte, end_byte, wanted in spans:
+            f.seek(start_byte)
+            text = zlib.decompressobj(-zlib.MAX_WBITS).decompress(f.read(end_byte - start_byte))
+            block_rows = list(csv.reader(io.StringIO(text.decode('utf-8'))))
+            for number in wanted:
+                rows[number] = block_rows[number - first_row]
+    return rows
+
+
+def _scan_rows(path, offset, limit):
+    with open_result(path) as f:
+        reader = csv.reader(f)
+        columns = next(reader, [])
+        rows = list(itertools.islice(reader, offset, offset + limit))
+        total = offset + len(rows) + sum(1 for _ in reader)
+    return columns, rows, total
+
+
+def read_hashes(path):
+    """(key hash, content hash) pairs of every row of a result, flattened in an array('Q').
+
+    Results written before the .hashes sidecar are hashed from the CSV.
+    """
+    hashes = array('Q')
+    try:
+        with open(hashes_path(path), 'rb') as f:
+            hashes.frombytes(f.read())
+        return hashes
+    except FileNotFoundError:
+        pass
+    with open_result(path) as f:
+        reader = csv.reader(f)
+        hash_row = row_hasher(next(reader, []))
+        for row in reader:
+            hashes.extend(hash_row(row))
+    return hashes
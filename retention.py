@@ -0,0 +1,203 @@
+import glob
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import func, update
+from extensions import db, redis_client, daily_quota
+from models import ScrapingJob, User
+from jobs import STORAGE_USAGE_KEY, WHATSAPP_RESULT_RETENTION_SECONDS, count_daily_jobs
+from job_events import EVENT_ARCHIVE_DIR, EVENT_RETENTION_SECONDS
+from results import RESULTS_DIR, job_result_files
+from plans import get_subscription_limits
+
+UPLOAD_DIR = 'uploads'
+# WhatsApp uploads are only read while their task runs, which also removes them
+UPLOAD_RETENTION_SECONDS = int(os.getenv('UPLOAD_RETENTION_HOURS', 24)) * 3600
+# Leftovers of crashed workers: unfinished .part results and Chrome profile copies
+STALE_TEMP_SECONDS = 2 * 86400
+ACTIVE_STATUSES = ('pending', 'running', 'paused')
+RETENTION_STATS_KEY = 'retention:stats'
+CHUNK_SIZE = 500
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _remove(path):
+    """Delete a file, returns the bytes freed (0 when it was already gone)"""
+    size = _file_size(path)
+    try:
+        os.remove(path)
+    except OSError:
+        return 0
+    return size
+
+
+def _remove_tree(path):
+    size = sum(_file_size(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    shutil.rmtree(path, ignore_errors=True)
+    return size
+
+
+def _older_than(path, seconds, now):
+    try:
+        return os.path.getmtime(path) < now - seconds
+    except OSError:
+        return False
+
+
+def _last_access(path):
+    stat = os.stat(path)
+    return max(stat.st_atime, stat.st_mtime)
+
+
+def drop_job_results(job_ids, stats, reason, with_logs=False):
+    """Delete the stored files of finished jobs and clear their result"""
+    for start in range(0, len(job_ids), CHUNK_SIZE):
+        chunk = job_ids[start:start + CHUNK_SIZE]
+        for job_id in chunk:
+            paths = job_result_files(job_id)
+            if with_logs:
+                paths.append(os.path.join(EVENT_ARCHIVE_DIR, f'job_{job_id}.jsonl'))
+            for path in paths:
+                freed = _remove(path)
+                stats[f'bytes_{reason}'] += freed
+                stats['files_deleted'] += bool(freed)
+        db.session.execute(update(ScrapingJob).where(ScrapingJob.id.in_(chunk)).values(result=None))
+        db.session.commit()
+        redis_client.delete(*[f'job:{job_id}:snapshot' for job_id in chunk])
+        stats[f'jobs_{reason}'] += len(chunk)
+
+
+def expire_results(stats, now):
+    """Results older than the owner's tier window"""
+    windows = {tier: get_subscription_limits(tier)['result_retention_days'] for tier in ('free', 'pro', 'enterprise')}
+    finished_at = func.coalesce(ScrapingJob.completed_at, ScrapingJob.created_at)
+    rows = db.session.query(ScrapingJob.id, finished_at, User.subscription_tier) \
+        .join(User, User.id == ScrapingJob.user_id) \
+        .filter(ScrapingJob.status == 'completed', ScrapingJob.result.isnot(None),
+                finished_at < now - timedelta(days=min(windows.values())))
+    expired = [job_id for job_id, finished, tier in rows
+               if finished < now - timedelta(days=windows.get(tier, windows['free']))]
+    drop_job_results(expired, stats, 'expired', with_logs=True)
+
+
+def evict_over_quota(stats):
+    """Least recently downloaded results of users above their storage quota"""
+    rows = db.session.query(ScrapingJob.id, ScrapingJob.user_id, User.subscription_tier) \
+        .join(User, User.id == ScrapingJob.user_id) \
+        .filter(ScrapingJob.status == 'completed', ScrapingJob.result.isnot(None))
+    stored = defaultdict(list)
+    tiers = {}
+    for job_id, user_id, tier in rows:
+        try:
+            files = [(path, os.path.getsize(path), _last_access(path)) for path in job_result_files(job_id)]
+        except OSError:
+            continue
+        if files:
+            stored[user_id].append((max(f[2] for f in files), job_id, sum(f[1] for f in files)))
+            tiers[user_id] = tier
+
+    evicted = []
+    usage = {}
+    for user_id, entries in stored.items():
+        quota = get_subscription_limits(tiers[user_id])['storage_quota_mb'] * 1024 * 1024
+        used = sum(size for _, _, size in entries)
+        for _, job_id, size in sorted(entries):
+            if used <= quota:
+                break
+            evicted.append(job_id)
+            used -= size
+        usage[user_id] = used
+    drop_job_results(evicted, stats, 'evicted')
+
+    pipe = redis_client.pipeline()
+    pipe.delete(STORAGE_USAGE_KEY)
+    if usage:
+        pipe.hset(STORAGE_USAGE_KEY, mapping=usage)
+    pipe.execute()
+
+
+def sweep_files(stats, now):
+    """Uploads, WhatsApp results and temp files, none of which have a database row"""
+    for path in glob.glob(os.path.join(RESULTS_DIR, '*.part')):
+        if _older_than(path, STALE_TEMP_SECONDS, now):
+            stats['bytes_temp'] += _remove(path)
+    for path in glob.glob(os.path.join(UPLOAD_DIR, '*')):
+        if _older_than(path, UPLOAD_RETENTION_SECONDS, now):
+            stats['bytes_uploads'] += _remove(path)
+    # Older WhatsApp results were written next to the app instead of results/
+    for path in glob.glob(os.path.join(RESULTS_DIR, 'whatsapp_results_*')) + glob.glob('whatsapp_results_*.csv'):
+        if _older_than(path, WHATSAPP_RESULT_RETENTION_SECONDS, now):
+            stats['bytes_whatsapp'] += _remove(path)
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), 'chrome_profile_*')):
+        if _older_than(path, STALE_TEMP_SECONDS, now):
+            stats['bytes_temp'] += _remove_tree(path)
+
+
+def expire_stale_keys(stats):
+    """Give a TTL to job and WhatsApp keys left behind by workers that never finished"""
+    active = {str(job_id) for (job_id,) in
+              db.session.query(ScrapingJob.id).filter(ScrapingJob.status.in_(ACTIVE_STATUSES))}
+    for pattern, ttl in (('job:*', EVENT_RETENTION_SECONDS), ('wa_result:*', WHATSAPP_RESULT_RETENTION_SECONDS)):
+        batch = []
+        for key in redis_client.scan_iter(match=pattern, count=1000):
+            if pattern == 'job:*' and key.decode().split(':')[1] in active:
+                continue
+            batch.append(key)
+            if len(batch) >= CHUNK_SIZE:
+                stats['keys_expired'] += _expire_persistent(batch, ttl)
+                batch = []
+        stats['keys_expired'] += _expire_persistent(batch, ttl)
+
+
+def reconcile_quotas(stats, now):
+    """Reset today's daily job counters from the database, dropping reservations of crashed requests"""
+    for key in redis_client.scan_iter(match=f'quota:*:{now.date().isoformat()}', count=1000):
+        user_id = int(key.decode().split(':')[1])
+        daily_quota.reconcile(user_id, lambda: count_daily_jobs(user_id))
+        stats['quotas_reconciled'] += 1
+
+
+def _expire_persistent(keys, ttl):
+    if not keys:
+        return 0
+    pipe = redis_client.pipeline()
+    for key in keys:
+        pipe.ttl(key)
+    persistent = [key for key, key_ttl in zip(keys, pipe.execute()) if key_ttl == -1]
+    for key in persistent:
+        pipe.expire(key, ttl)
+    pipe.execute()
+    return len(persistent)
+
+
+def run_retention():
+    """One retention pass; returns what it reclaimed and adds it to the running totals"""
+    lock = redis_client.lock('retention:lock', timeout=3600)
+    if not lock.acquire(blocking=False):
+        return None
+    stats = Counter()
+    try:
+        now = time.time()
+        expire_results(stats, datetime.utcnow())
+        evict_over_quota(stats)
+        sweep_files(stats, now)
+        expire_stale_keys(stats)
+        reconcile_quotas(stats, datetime.utcnow())
+    finally:
+        lock.release()
+    stats['bytes_reclaimed'] = sum(v for k, v in stats.items() if k.startswith('bytes_'))
+    pipe = redis_client.pipeline()
+    for field, value in stats.items():
+        pipe.hincrby(RETENTION_STATS_KEY, field, value)
+    pipe.hset(RETENTION_STATS_KEY, 'last_run', int(now))
+    pipe.execute()
+    return dict(stats)
@@ -15,6 +15,7 @@ import platform
 import time
 import traceback
 from datetime import datetime
+from job_control import JobStopped
 
 # --- Helpers ---
 # TODO: Future speed-up by parallelizing detail fetch
@@ -171,49 +172,52 @@ def main(listing_type="Yayındaki İlanlar", sort_by="Varsayılan sıralama (tar
         processed_links = set()
         
         # Her sayfayı işle
-        for page in range(1, total_pages + 1):
-            if thread and thread.should_stop:
-                break
-                
-            if page > 1:
-                # Sayfa URL'ini oluştur
-                page_url = f"{url}&page={page}"
-                thread.driver.get(page_url)
-                time.sleep(5)  # Sayfa yüklenmesini bekle
-            
-            # İlan linklerini topla
-            listing_links = get_listing_hrefs(thread.driver, base_url, page)
-            
-            # Her ilanı işle
-            for href in listing_links:
-                if thread and thread.should_stop:
-                    break
-                    
-                if href in processed_links:
-                    continue
+        try:
+            for page in range(1, total_pages + 1):
+                if thread:
+                    thread.control.checkpoint()
                     
-                processed_links.add(href)
+                if page > 1:
+                    # Sayfa URL'ini oluştur
+                    page_url = f"{url}&page={page}"
+                    thread.driver.get(page_url)
+                    time.sleep(5)  # Sayfa yüklenmesini bekle
                 
-                try:
-                    # İlan detaylarını al
-                    ad = parse_detail(thread.driver, href)
-                    if ad:
-                        # Yeni veriyi CSV'ye ekle
-                        new_df = pd.DataFrame([ad])
-                        new_df.to_csv(filename, mode='a', header=False, index=False, encoding='utf-8-sig')
+                # İlan linklerini topla
+                listing_links = get_listing_hrefs(thread.driver, base_url, page)
+                
+                # Her ilanı işle
+                for href in listing_links:
+                    if thread:
+                        thread.control.checkpoint()
                         
-                        # İlerleme bilgisini güncelle
-                        if thread:
-                            thread.progress_updated.emit(len(processed_links))
+                    if href in processed_links:
+                        continue
                         
-                        logging.info(f"✅ Veri Çekildi: {ad['Ilan Basligi']}")
-                except Exception as e:
-                    logging.error(f"İlan detayları alınamadı: {href} - Hata: {e}")
-                    continue
-            
-            # Sayfa ilerleme bilgisini güncelle
-            if thread:
-                thread.page_progress_updated.emit(page)
+                    processed_links.add(href)
+                    
+                    try:
+                        # İlan detaylarını al
+                        ad = parse_detail(thread.driver, href)
+                        if ad:
+                            # Yeni veriyi CSV'ye ekle
+                            new_df = pd.DataFrame([ad])
+                            new_df.to_csv(filename, mode='a', header=False, index=False, encoding='utf-8-sig')
+                            
+                            # İlerleme bilgisini güncelle
+                            if thread:
+                                thread.progress_updated.emit(len(processed_links))
+                            
+                            logging.info(f"✅ Veri Çekildi: {ad['Ilan Basligi']}")
+                    except Exception as e:
+                        logging.error(f"İlan detayları alınamadı: {href} - Hata: {e}")
+                        continue
+                
+                # Sayfa ilerleme bilgisini güncelle
+                if thread:
+                    thread.page_progress_updated.emit(page)
+        except JobStopped:
+            logging.info("Scraper durduruldu.")
         
         logging.info(f"Toplam {len(processed_links)} ilan başarıyla kaydedildi.")
         return filename
@@ -16,6 +16,8 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 import traceback
 import platform
+from job_control import LocalJobControl, WAITING_LOGIN, LOGIN_CONFIRMED, RUNNING, PAUSED, STOPPED
+from session_vault import SessionVault, restore_revy_session
 import time
 
 class LogHandler(logging.Handler):
@@ -77,28 +79,36 @@ class ScraperThread(QThread):
         self.sort_by = sort_by
         self.save_path = save_path
         self.custom_filename = custom_filename
-        self.manual_confirmation = False
         self.driver = None
-        self.is_paused = False
-        self.should_stop = False
-        self.should_start = False
+        self.control = LocalJobControl(WAITING_LOGIN)
         self.total_ads = 0
         self.current_ad = 0
 
+    @property
+    def is_paused(self):
+        return self.control.paused
+
+    @property
+    def should_stop(self):
+        return self.control.stopped
+
+    def confirm_login(self):
+        self.control.set_state(LOGIN_CONFIRMED)
+
     def pause(self):
-        self.is_paused = True
+        self.control.set_state(PAUSED)
         logging.info("Scraper duraklatıldı")
 
     def resume(self):
-        self.is_paused = False
+        self.control.set_state(RUNNING)
         logging.info("Scraper devam ediyor")
 
     def stop(self):
-        self.should_stop = True
+        self.control.set_state(STOPPED)
         logging.info("Scraper durduruluyor")
 
     def start_scraper(self):
-        self.should_start = True
+        self.control.set_state(RUNNING)
         logging.info("Scraper başlatılıyor...")
 
     def run(self):
@@ -131,25 +141,29 @@ class ScraperThread(QThread):
                 logging.info("PATH içindeki chromedriver kullanılacak, lütfen kurulu olduğundan emin olun.")
                 self.driver = webdriver.Chrome(options=options)
             
-            # Revy sayfasını aç
-            self.driver.get("https://www.revy.com.tr/")
-            logging.info("✅ Chrome başlatıldı ve Revy sayfası açıldı.")
-            
-            # Manuel onay sinyalini gönder
-            self.manual_confirmation_needed.emit()
-            
-            # Manuel onay bekleniyor
-            while not self.manual_confirmation:
-                self.msleep(100)  # 100ms bekle
-                if self.should_stop:
+            # Kayıtlı oturum geçerliyse manuel girişi atla
+            vault = SessionVault('revy', 'desktop')
+            if restore_revy_session(self.driver, vault, "https://www.revy.com.tr/app/portfoy/ilanlar?export=0&fsbo=true"):
+                logging.info("✅ Kayıtlı Revy oturumu kullanıldı.")
+                self.control.set_state(RUNNING)
+            else:
+                # Revy sayfasını aç
+                self.driver.get("https://www.revy.com.tr/")
+                logging.info("✅ Chrome başlatıldı ve Revy sayfası açıldı.")
+                
+                # Manuel onay sinyalini gönder
+                self.manual_confirmation_needed.emit()
+                
+                # Manuel onay bekleniyor
+                if self.control.wait_until(lambda state: state != WAITING_LOGIN) == STOPPED:
                     return
-            
-            # Başlatma sinyali bekleniyor
-            logging.info("❗ Revy'ye giriş yaptıktan sonra 'Başlat' butonuna tıklayın...")
-            while not self.should_start:
-                self.msleep(100)  # 100ms bekle
-                if self.should_stop:
+                
+                # Başlatma sinyali bekleniyor
+                logging.info("❗ Revy'ye giriş yaptıktan sonra 'Başlat' butonuna tıklayın...")
+                if self.control.wait_until(lambda state: state not in (WAITING_LOGIN, LOGIN_CONFIRMED)) == STOPPED:
                     return
+                vault.save_cookies(self.driver)
+                logging.info("Revy oturumu kaydedildi, sonraki çalıştırmalarda giriş istenmeyecek.")
 
             # FSBO sayfasına git
             logging.info("FSBO sayfasına yönlendiriliyor...")
@@ -538,7 +552,7 @@ class MainWindow(QMainWindow):
         msg.setStandardButtons(QMessageBox.StandardButton.Ok)
         
         if msg.exec() == QMessageBox.StandardButton.Ok:
-            self.scraper_thread.manual_confirmation = True
+            self.scraper_thread.confirm_login()
             self.continue_button.setEnabled(True)
 
     def scraper_finished(self):
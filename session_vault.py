@@ -0,0 +1,169 @@
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import urllib.parse
+from datetime import datetime
+from cryptography.fernet import Fernet, InvalidToken
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+SESSION_VAULT_DIR = os.getenv('SESSION_VAULT_DIR', 'sessions')
+
+# Chrome profile folders that only hold caches; skipped so saved profiles stay small
+PROFILE_SKIP = {
+    'Cache', 'Code Cache', 'GPUCache', 'CacheStorage', 'ScriptCache', 'ShaderCache',
+    'GrShaderCache', 'GraphiteDawnCache', 'DawnCache', 'Crashpad', 'BrowserMetrics',
+    'component_crx_cache', 'optimization_guide_model_store', 'Safe Browsing'
+}
+
+
+def _vault_key(directory):
+    key = os.getenv('SESSION_VAULT_KEY')
+    if key:
+        return key.encode()
+    # Tek makine kurulumları için anahtar ilk kullanımda üretilip saklanır
+    os.makedirs(directory, exist_ok=True)
+    key_path = os.path.join(directory, 'vault.key')
+    try:
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(key_path, 'rb') as f:
+            return f.read().strip()
+    key = Fernet.generate_key()
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    return key
+
+
+def _skip_cache(member):
+    parts = member.name.split('/')
+    if any(part in PROFILE_SKIP for part in parts) or parts[-1].startswith('Singleton'):
+        return None
+    return member
+
+
+class SessionVault:
+    """Encrypted per-user store of browser login sessions (cookies or a whole Chrome profile)"""
+
+    def __init__(self, service, user_id, directory=None):
+        self.directory = directory or SESSION_VAULT_DIR
+        self.path = os.path.join(self.directory, f'{service}_{user_id}.bin')
+        self.fernet = Fernet(_vault_key(self.directory))
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def read(self):
+        try:
+            with open(self.path, 'rb') as f:
+                return self.fernet.decrypt(f.read())
+        except FileNotFoundError:
+            return None
+        except InvalidToken:
+            # Written with another key, useless from now on
+            self.clear()
+            return None
+
+    def write(self, payload):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.fernet.encrypt(payload))
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def save_cookies(self, driver):
+        """Store the cookies and localStorage of the page the driver is on"""
+        state = {
+            'origin': '{0.scheme}://{0.netloc}'.format(urllib.parse.urlsplit(driver.current_url)),
+            'cookies': driver.get_cookies(),
+            'local_storage': driver.execute_script(
+                "var s = {}; for (var i = 0; i < localStorage.length; i++) {"
+                " var k = localStorage.key(i); s[k] = localStorage.getItem(k); } return s;"
+            ) or {},
+            'saved_at': datetime.utcnow().isoformat()
+        }
+        self.write(json.dumps(state).encode())
+
+    def restore_cookies(self, driver):
+        """Load a saved cookie session into the driver, False if there is none"""
+        payload = self.read()
+        if not payload:
+            return False
+        state = json.loads(payload)
+        # Cookies can only be set for the open domain; a static file is the cheapest page there
+        driver.get(state['origin'] + '/robots.txt')
+        driver.delete_all_cookies()
+        for cookie in state['cookies']:
+            if 'expiry' in cookie:
+                cookie['expiry'] = int(cookie['expiry'])
+            if cookie.get('sameSite') not in ('Strict', 'Lax', 'None'):
+                cookie.pop('sameSite', None)
+            try:
+                driver.add_cookie(cookie)
+            except Exception:
+                continue
+        if state['local_storage']:
+            driver.execute_script(
+                "var s = arguments[0]; for (var k in s) { localStorage.setItem(k, s[k]); }",
+                state['local_storage']
+            )
+        return True
+
+    def open_profile(self):
+        """Extract the saved Chrome profile into a fresh temp dir for --user-data-dir"""
+        profile_dir = tempfile.mkdtemp(prefix='chrome_profile_')
+        try:
+            payload = self.read()
+            if payload:
+                with tarfile.open(fileobj=io.BytesIO(payload), mode='r:gz') as tar:
+                    if hasattr(tarfile, 'data_filter'):
+                        tar.extractall(profile_dir, filter='data')
+                    else:
+                        tar.extractall(profile_dir)
+        except Exception:
+            self.discard_profile(profile_dir)
+            raise
+        return profile_dir
+
+    def save_profile(self, profile_dir):
+        """Pack and encrypt a Chrome profile; call after driver.quit() so it is flushed"""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w:gz') as tar:
+            tar.add(profile_dir, arcname='.', filter=_skip_cache)
+        self.write(buffer.getvalue())
+
+    @staticmethod
+    def discard_profile(profile_dir):
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+def restore_revy_session(driver, vault, check_url):
+    """Restore saved Revy cookies and check them with one page load of check_url"""
+    if not vault.restore_cookies(driver):
+        return False
+    # Geçersiz oturumda Revy sunucu tarafında /login'e yönlendirir
+    driver.get(check_url)
+    if '/login' not in driver.current_url and '/app/portfoy' in driver.current_url:
+        return True
+    vault.clear()
+    return False
+
+
+def whatsapp_logged_in(driver, timeout=30):
+    """True once the chat list shows up, False if WhatsApp Web asks for a QR scan"""
+    try:
+        WebDriverWait(driver, timeout).until(
+            lambda d: d.find_elements(By.ID, 'pane-side') or d.find_elements(By.CSS_SELECTOR, 'canvas[aria-label]')
+        )
+    except Exception:
+        return False
+    return bool(driver.find_elements(By.ID, 'pane-side'))
@@ -0,0 +1,79 @@
+"""Measure cold import time and resident memory per process type.
+
+Usage: python startup_benchmark.py [--runs N]
+
+Each process type is started in a fresh interpreter so module caches from
+one measurement never leak into the next.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+PROCESS_TYPES = {
+    'web': 'from app import create_app; create_app()',
+    'worker': 'import worker',
+}
+
+# Modules that belong to the scraping stack and should stay out of web workers
+HEAVY_MODULES = ['selenium', 'webdriver_manager', 'pandas', 'celery', 'stripe', 'requests']
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+exec({code!r})
+elapsed = time.perf_counter() - start
+rss_kb = 0
+try:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                rss_kb = int(line.split()[1])
+except OSError:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_kb = rss // 1024 if sys.platform == 'darwin' else rss
+print(json.dumps({{
+    'seconds': elapsed,
+    'rss_kb': rss_kb,
+    'modules': len(sys.modules),
+    'heavy': [m for m in {heavy!r} if m in sys.modules],
+}}))
+'''
+
+
+def measure(code, runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(code=code, heavy=HEAVY_MODULES)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'import_ms': round(statistics.median(s['seconds'] for s in samples) * 1000, 1),
+        'rss_mb': round(statistics.median(s['rss_kb'] for s in samples) / 1024, 1),
+        'modules': samples[-1]['modules'],
+        'heavy_modules': samples[-1]['heavy'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'process':<8} {'import ms':>10} {'RSS MB':>8} {'modules':>8}  heavy modules")
+    for name, code in PROCESS_TYPES.items():
+        try:
+            result = measure(code, args.runs)
+        except subprocess.CalledProcessError as e:
+            print(f"{name:<8} failed: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+            continue
+        print(f"{name:<8} {result['import_ms']:>10} {result['rss_mb']:>8} {result['modules']:>8}  "
+              f"{', '.join(result['heavy_modules']) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,931 @@
+from flask import Blueprint, current_app, g, render_template, request, jsonify, redirect, url_for, flash, abort
+from flask_login import login_user, login_required, logout_user, current_user
+import os
+from datetime import datetime, timedelta
+import secrets
+import hashlib
+import hmac
+import json
+import uuid
+from werkzeug.utils import secure_filename
+from sqlalchemy import insert
+from extensions import (db, login_manager, redis_client, daily_quota, api_rate_limiter, user_cache, template_cache,
+                        webhook_cache)
+from models import User, ScrapingJob, UserJobStats, Template, Webhook
+from jobs import (SCRAPE_TASK, WHATSAPP_TASK, REVY_TASK, REVY_LISTINGS_URL, JobProgress, enqueue, enqueue_group,
+                  store_revy_credentials, has_revy_session, job_control, whatsapp_control, job_events,
+                  whatsapp_events, count_daily_jobs, get_job_stats, update_job_stats, set_job_status,
+                  get_job_snapshot, get_batch_summary, commit_job, queue_webhook_event, JOB_LIST_FIELDS,
+                  list_jobs, get_job_statuses, STORAGE_USAGE_KEY, set_whatsapp_owner, whatsapp_owner)
+from job_control import LOGIN_CONFIRMED, RUNNING, PAUSED, STOPPED
+from job_events import replay, is_stream_id
+from downloads import resolve_result_path, send_result
+from exports import EXPORT_FORMATS, get_export
+from results import read_rows
+from result_query import query_key, run_query
+from result_diff import ResultDiff
+from price_history import get_price_changes, get_listing_history
+from webhooks import check_webhook_url
+from plans import get_subscription_limits
+
+views = Blueprint('views', __name__)
+
+STRIPE_PUBLIC_KEY = os.getenv('STRIPE_PUBLIC_KEY')
+
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 500))
+MAX_WEBHOOKS = 5
+MAX_JOBS_PAGE = 200
+MAX_ROWS_PAGE = 1000
+# Larger diffs are only sent as a JSONL stream
+MAX_DIFF_ROWS = 1000
+QUERY_CACHE_TTL = 3600
+DEFAULT_JOB_FIELDS = ('id', 'url', 'status', 'batch_id', 'created_at', 'completed_at')
+# Pause/resume/stop would rewrite these and send another job.* webhook
+FINISHED_STATUSES = ('completed', 'failed')
+
+# Shopier Configuration
+SHOPIER_API_KEY = os.getenv('SHOPIER_API_KEY')
+SHOPIER_API_SECRET = os.getenv('SHOPIER_API_SECRET')
+SHOPIER_API_URL = os.getenv('SHOPIER_API_URL', 'https://www.shopier.com/api')
+
+# Helper functions
+def generate_api_key():
+    return secrets.token_urlsafe(32)
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def get_templates(include_premium):
+    """Template list served from the versioned cache, reloaded after a template is added"""
+    def load():
+        query = Template.query
+        if not include_premium:
+            query = query.filter(Template.is_premium == False)
+        templates = query.all()
+        for t in templates:
+            db.session.expunge(t)
+        return templates
+    return template_cache.get('all' if include_premium else 'basic', load)
+
+# Shopier Helper Functions
+def generate_shopier_signature(data):
+    """Generate Shopier signature for API requests"""
+    message = json.dumps(data, sort_keys=True)
+    signature = hmac.new(
+        SHOPIER_API_SECRET.encode(),
+        message.encode(),
+        hashlib.sha256
+    ).hexdigest()
+    return signature
+
+def create_shopier_payment(user, plan):
+    """Create a payment request in Shopier"""
+    price = {
+        'pro': 29.99,
+        'enterprise': 99.99
+    }.get(plan, 0)
+    
+    if price == 0:
+        return None
+    
+    data = {
+        'api_key': SHOPIER_API_KEY,
+        'website_index': 1,
+        'platform_order_id': f"order_{user.id}_{int(datetime.utcnow().timestamp())}",
+        'product_name': f"iScrape {plan.title()} Plan",
+        'product_type': 'Subscription',
+        'buyer_name': user.email,
+        'buyer_email': user.email,
+        'amount': price,
+        'currency': 'TRY',
+        'callback_url': f"{request.host_url}api/shopier/callback",
+        'platform': 'iScrape',
+        'is_in_frame': 0,
+        'current_language': 'tr-TR'
+    }
+    
+    data['signature'] = generate_shopier_signature(data)
+    
+    import requests
+    try:
+        response = requests.post(f"{SHOPIER_API_URL}/payment", json=data)
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException as e:
+        current_app.logger.error(f"Shopier API error: {str(e)}")
+        return None
+
+# Routes
+@views.route('/')
+def index():
+    """Ana sayfa route'u"""
+    try:
+        return render_template('index.html')
+    except Exception as e:
+        current_app.logger.error(f"Index route error: {str(e)}")
+        return str(e), 500
+
+@views.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        email = request.form.get('email')
+        password = request.form.get('password')
+        user = User.query.filter_by(email=email).first()
+        
+        if user and user.password == hash_password(password):
+            login_user(user)
+            return redirect(url_for('views.dashboard'))
+        
+        flash('Invalid email or password')
+    return render_template('login.html')
+
+@views.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        email = request.form.get('email')
+        password = request.form.get('password')
+        confirm_password = request.form.get('confirm_password')
+        plan = request.form.get('plan')
+        
+        if password != confirm_password:
+            flash('Passwords do not match')
+            return redirect(url_for('views.register'))
+        
+        if User.query.filter_by(email=email).first():
+            flash('Email already registered')
+            return redirect(url_for('views.register'))
+        
+        # Create Stripe customer if paid plan
+        stripe_customer_id = None
+        if plan != 'free':
+            stripe_token = request.form.get('stripeToken')
+            if not stripe_token:
+                flash('Payment information required for paid plans')
+                return redirect(url_for('views.register'))
+            
+            # Stripe is only needed here, keep it out of the web worker boot
+            import stripe
+            stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
+            try:
+                customer = stripe.Customer.create(
+                    email=email,
+                    source=stripe_token
+                )
+                stripe_customer_id = customer.id
+                
+                # Create subscription
+                price_id = {
+                    'pro': 'price_pro_monthly',
+                    'enterprise': 'price_enterprise_monthly'
+                }.get(plan)
+                
+                if price_id:
+                    stripe.Subscription.create(
+                        customer=customer.id,
+                        items=[{'price': price_id}]
+                    )
+            except stripe.error.StripeError as e:
+                flash(f'Payment error: {str(e)}')
+                return redirect(url_for('views.register'))
+        
+        # Create user
+        user = User(
+            email=email,
+            password=hash_password(password),
+            subscription_tier=plan,
+            stripe_customer_id=stripe_customer_id,
+            api_key=generate_api_key()
+        )
+        
+        if plan != 'free':
+            user.subscription_end = datetime.utcnow() + timedelta(days=30)
+        
+        db.session.add(user)
+        db.session.commit()
+        
+        login_user(user)
+        return redirect(url_for('views.dashboard'))
+    
+    return render_template('register.html', stripe_public_key=STRIPE_PUBLIC_KEY)
+
+@views.route('/dashboard')
+@login_required
+def dashboard():
+    # Get user's daily job count
+    user_id = current_user.id
+    daily_jobs = daily_quota.usage(user_id, lambda: count_daily_jobs(user_id))
+    
+    # Get total and completed jobs from the per-user stats row
+    stats = UserJobStats.query.get(user_id)
+    if stats is None:
+        stats = get_job_stats(user_id)
+        db.session.commit()
+    total_jobs = stats.total_jobs
+    completed_jobs = stats.completed_jobs
+    success_rate = (completed_jobs / total_jobs * 100) if total_jobs > 0 else 0
+    
+    # Get recent jobs
+    recent_jobs = ScrapingJob.query.filter_by(user_id=current_user.id).order_by(
+        ScrapingJob.created_at.desc()
+    ).limit(5).all()
+    
+    # Get available templates (premium templates for paid users)
+    templates = get_templates(current_user.subscription_tier != 'free')
+    
+    # Get subscription limits
+    limits = get_subscription_limits(current_user.subscription_tier)
+    
+    return render_template('dashboard.html',
+        daily_jobs=daily_jobs,
+        daily_limit=limits['daily_jobs'],
+        total_jobs=total_jobs,
+        success_rate=round(success_rate, 1),
+        recent_jobs=recent_jobs,
+        templates=templates
+    )
+
+@views.route('/api/scrape', methods=['POST'])
+@login_required
+def scrape():
+    # Check user's subscription and limits
+    limits = get_subscription_limits(current_user.subscription_tier)
+    
+    # Get request data
+    url = request.form.get('url')
+    template_id = request.form.get('template')
+    
+    if not url or not template_id:
+        return jsonify({'error': 'URL and template are required'}), 400
+    
+    # Validate template access
+    template = Template.query.get(template_id)
+    if not template:
+        return jsonify({'error': 'Invalid template'}), 400
+    
+    if template.is_premium and current_user.subscription_tier == 'free':
+        return jsonify({'error': 'Premium template not available in free tier'}), 403
+    
+    # Check and reserve the daily limit atomically
+    user_id = current_user.id
+    allowed, _ = daily_quota.consume(user_id, limits['daily_jobs'], lambda: count_daily_jobs(user_id))
+    if not allowed:
+        return jsonify({'error': 'Daily limit reached'}), 403
+    
+    # Create new scraping job
+    job = ScrapingJob(
+        user_id=user_id,
+        url=url,
+        template_id=template_id
+    )
+    try:
+        db.session.add(job)
+        update_job_stats(user_id, total_jobs=1)
+        commit_job(job)
+    except Exception:
+        db.session.rollback()
+        daily_quota.release(user_id)
+        raise
+    
+    # Start scraping process asynchronously
+    enqueue(SCRAPE_TASK, job.id)
+    
+    return jsonify({
+        'job_id': job.id,
+        'status': 'started',
+        'message': 'Scraping job started successfully'
+    })
+
+@views.route('/api/scrape/batch', methods=['POST'])
+@login_required
+def scrape_batch():
+    """Create many scraping jobs in one transaction and dispatch them as one Celery group.
+
+    Body: {"template": 1, "urls": [...]} or {"jobs": [{"url": ..., "template": ...}, ...]}
+    """
+    data = request.get_json(silent=True) or {}
+    default_template = data.get('template')
+    items = data.get('jobs') or [{'url': url} for url in data.get('urls') or []]
+    if not items:
+        return jsonify({'error': 'urls or jobs are required'}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'At most {MAX_BATCH_SIZE} jobs per batch'}), 400
+
+    rows = []
+    errors = []
+    for index, item in enumerate(items):
+        item = item if isinstance(item, dict) else {'url': item}
+        url = str(item.get('url') or '').strip()
+        template_id = item.get('template', default_template)
+        try:
+            template_id = int(template_id)
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'error': 'URL and template are required'})
+            continue
+        if not url:
+            errors.append({'index': index, 'error': 'URL and template are required'})
+            continue
+        # Keep the submitted position so later errors point at the right item
+        rows.append((index, url, template_id))
+
+    # One query for every template the batch references
+    templates = {t.id: t for t in Template.query.filter(Template.id.in_({t for _, _, t in rows}))}
+    for index, _, template_id in rows:
+        template = templates.get(template_id)
+        if not template:
+            errors.append({'index': index, 'error': 'Invalid template'})
+        elif template.is_premium and current_user.subscription_tier == 'free':
+            return jsonify({'error': 'Premium template not available in free tier'}), 403
+    if errors:
+        errors.sort(key=lambda error: error['index'])
+        return jsonify({'error': 'Invalid jobs in batch', 'jobs': errors}), 400
+
+    # Reserve the whole batch against the daily limit at once
+    limits = get_subscription_limits(current_user.subscription_tier)
+    user_id = current_user.id
+    allowed, used = daily_quota.consume(user_id, limits['daily_jobs'], lambda: count_daily_jobs(user_id),
+                                        amount=len(rows))
+    if not allowed:
+        return jsonify({'error': 'Daily limit reached',
+                        'remaining': max(limits['daily_jobs'] - used, 0)}), 403
+
+    batch_id = str(uuid.uuid4())
+    try:
+        # Bulk insert; IDs come back in input order from the same statement
+        job_ids = db.session.scalars(
+            insert(ScrapingJob).returning(ScrapingJob.id, sort_by_parameter_order=True),
+            [{'user_id': user_id, 'url': url, 'template_id': template_id, 'batch_id': batch_id}
+             for _, url, template_id in rows]
+        ).all()
+        update_job_stats(user_id, total_jobs=len(job_ids))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        daily_quota.release(user_id, len(rows))
+        raise
+
+    enqueue_group(SCRAPE_TASK, [(job_id,) for job_id in job_ids], batch_id)
+
+    return jsonify({
+        'batch_id': batch_id,
+        'job_ids': job_ids,
+        'status': 'started',
+        'message': f'{len(job_ids)} scraping jobs started successfully'
+    })
+
+@views.route('/api/batch/<batch_id>')
+@login_required
+def get_batch_status(batch_id):
+    summary = get_batch_summary(current_user.id, batch_id)
+    if summary is None:
+        abort(404)
+    return jsonify(summary)
+
+@views.route('/api/jobs')
+@login_required
+def list_jobs_api():
+    """Job history, newest first: ?limit=&cursor=&status=a,b&batch_id=&fields=id,status,..."""
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), MAX_JOBS_PAGE)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    fields = [f for f in request.args.get('fields', ','.join(DEFAULT_JOB_FIELDS)).split(',') if f]
+    unknown = [f for f in fields if f not in JOB_LIST_FIELDS]
+    if unknown or not fields:
+        return jsonify({'error': f'Unknown fields: {", ".join(unknown)}', 'fields': JOB_LIST_FIELDS}), 400
+    statuses = [s for s in request.args.get('status', '').split(',') if s]
+    try:
+        jobs, next_cursor = list_jobs(current_user.id, fields, statuses, request.args.get('batch_id'),
+                                      request.args.get('cursor'), limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'jobs': jobs, 'next_cursor': next_cursor})
+
+@views.route('/api/jobs/status')
+@login_required
+def bulk_job_status():
+    """Compact status map for polling many jobs at once: ?ids=1,2,3 -> {"1": "completed", ...}"""
+    try:
+        job_ids = {int(i) for i in request.args.get('ids', '').split(',') if i}
+    except ValueError:
+        return jsonify({'error': 'ids must be integers'}), 400
+    if not job_ids or len(job_ids) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Between 1 and {MAX_BATCH_SIZE} ids are required'}), 400
+    # Other users' and unknown IDs are simply absent
+    return jsonify({str(job_id): status for job_id, status in get_job_statuses(current_user.id, job_ids).items()})
+
+@views.route('/api/job/<int:job_id>')
+@login_required
+def get_job_status(job_id):
+    snapshot = get_job_snapshot(job_id)
+    if snapshot is None:
+        abort(404)
+    if snapshot['user_id'] != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    return jsonify({
+        'status': snapshot['status'],
+        'created_at': snapshot['created_at'],
+        'completed_at': snapshot['completed_at'],
+        'result': snapshot['result']
+    })
+
+@views.route('/api/job/<int:job_id>/download')
+@login_required
+def download_job_results(job_id):
+    job = ScrapingJob.query.get_or_404(job_id)
+    if job.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    if job.status != 'completed' or not job.result:
+        return jsonify({'error': 'No results available'}), 404
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    _, mimetype, plan_format = EXPORT_FORMATS[fmt]
+    if plan_format not in get_subscription_limits(current_user.subscription_tier)['export_formats']:
+        return jsonify({'error': f'{fmt} export is not available in your plan'}), 403
+    path = get_export(resolve_result_path(job.result), job_id, fmt)
+    return send_result(path, f'job_{job_id}_results.{fmt}', mimetype)
+
+@views.route('/api/job/<int:job_id>/rows')
+@login_required
+def job_result_rows(job_id):
+    """A slice of a job's result for the dashboard table: ?offset=0&limit=100"""
+    job = ScrapingJob.query.get_or_404(job_id)
+    if job.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    if job.status != 'completed' or not job.result:
+        return jsonify({'error': 'No results available'}), 404
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 100)), 1), MAX_ROWS_PAGE)
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    columns, rows, total = read_rows(resolve_result_path(job.result), offset, limit)
+    return jsonify({'columns': columns, 'rows': rows, 'offset': offset, 'total': total})
+
+@views.route('/api/job/<int:job_id>/query', methods=['POST'])
+@login_required
+def query_job_results(job_id):
+    """Filter, sort and group a job's result on the server; the spec is documented in result_query"""
+    job = ScrapingJob.query.get_or_404(job_id)
+    if job.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    if job.status != 'completed' or not job.result:
+        return jsonify({'error': 'No results available'}), 404
+    spec = request.get_json(silent=True)
+    if not isinstance(spec, dict):
+        return jsonify({'error': 'A JSON query is required'}), 400
+    # Results never change once written, so a query's answer can be reused until it expires
+    key = query_key(job_id, spec)
+    cached = redis_client.get(key)
+    if cached:
+        return current_app.response_class(cached, mimetype='application/json')
+    parquet_file = get_export(resolve_result_path(job.result), job_id, 'parquet')
+    try:
+        body = json.dumps(run_query(parquet_file, spec), ensure_ascii=False, default=str)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    redis_client.set(key, body, ex=QUERY_CACHE_TTL)
+    return current_app.response_class(body, mimetype='application/json')
+
+@views.route('/api/job/<int:job_id>/diff/<int:other_id>')
+@login_required
+def diff_job_results(job_id, other_id):
+    """Listings added, removed and changed from job `job_id` to job `other_id`; ?format=jsonl streams them"""
+    paths = []
+    for jid in (job_id, other_id):
+        job = ScrapingJob.query.get_or_404(jid)
+        if job.user_id != current_user.id:
+            return jsonify({'error': 'Unauthorized'}), 403
+        if job.status != 'completed' or not job.result:
+            return jsonify({'error': 'No results available'}), 404
+        paths.append(resolve_result_path(job.result))
+    diff = ResultDiff(*paths)
+    if request.args.get('format') == 'jsonl':
+        def generate():
+            yield json.dumps({'type': 'summary', **diff.counts}) + '\n'
+            for entry in diff:
+                yield json.dumps(entry, ensure_ascii=False) + '\n'
+        return current_app.response_class(generate(), mimetype='application/x-ndjson')
+    if sum(diff.counts.values()) > MAX_DIFF_ROWS:
+        return jsonify({'error': 'Diff too large, use ?format=jsonl', **diff.counts}), 400
+    entries = {'added': [], 'removed': [], 'changed': []}
+    for entry in diff:
+        entries[entry.pop('type')].append(entry)
+    return jsonify({'counts': diff.counts, **entries})
+
+@views.route('/api/storage')
+@login_required
+def storage_usage():
+    """Result storage as of the last retention run; over-quota results are evicted least recently downloaded first"""
+    limits = get_subscription_limits(current_user.subscription_tier)
+    return jsonify({
+        'used_bytes': int(redis_client.hget(STORAGE_USAGE_KEY, current_user.id) or 0),
+        'quota_bytes': limits['storage_quota_mb'] * 1024 * 1024,
+        'retention_days': limits['result_retention_days']
+    })
+
+@views.route('/api/listings/price-changes')
+@login_required
+def listing_price_changes():
+    """Listings whose price changed: ?since=&until= (ISO, default the last 7 days)&direction=up|down&limit=&cursor="""
+    try:
+        until = datetime.fromisoformat(request.args['until']) if request.args.get('until') else datetime.utcnow()
+        since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else until - timedelta(days=7)
+        limit = min(max(int(request.args.get('limit', 50)), 1), MAX_JOBS_PAGE)
+    except ValueError:
+        return jsonify({'error': 'since/until must be ISO dates and limit an integer'}), 400
+    direction = request.args.get('direction')
+    if direction not in (None, 'up', 'down'):
+        return jsonify({'error': 'direction must be up or down'}), 400
+    try:
+        changes, next_cursor = get_price_changes(current_user.id, since, until, direction,
+                                                 request.args.get('cursor'), limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'changes': changes, 'next_cursor': next_cursor})
+
+@views.route('/api/listings/<int:listing_id>/history')
+@login_required
+def listing_history(listing_id):
+    history = get_listing_history(current_user.id, listing_id)
+    if history is None:
+        abort(404)
+    return jsonify({'listing_id': listing_id, 'history': history})
+
+@views.route('/dashboard/upgrade')
+@login_required
+def upgrade():
+    return render_template('upgrade.html', stripe_public_key=STRIPE_PUBLIC_KEY)
+
+@views.route('/api/upgrade', methods=['POST'])
+@login_required
+def process_upgrade():
+    """Handle subscription upgrade"""
+    new_plan = request.form.get('plan')
+    if not new_plan or new_plan not in ['pro', 'enterprise']:
+        return jsonify({'error': 'Invalid plan'}), 400
+    
+    # Create Shopier payment
+    payment = create_shopier_payment(current_user, new_plan)
+    if not payment:
+        return jsonify({'error': 'Failed to create payment'}), 400
+    
+    return jsonify({
+        'success': True,
+        'payment_url': payment.get('payment_url')
+    })
+
+@views.route('/api/shopier/callback', methods=['POST'])
+def shopier_callback():
+    """Handle Shopier payment callback"""
+    data = request.form.to_dict()
+    signature = data.pop('signature', None)
+    
+    if not signature or signature != generate_shopier_signature(data):
+        return jsonify({'error': 'Invalid signature'}), 400
+    
+    if data.get('status') != 'success':
+        return jsonify({'error': 'Payment failed'}), 400
+    
+    # Extract order information
+    order_id = data.get('platform_order_id')
+    user_id = int(order_id.split('_')[1])
+    plan = order_id.split('_')[2]
+    
+    # Update user subscription
+    user = User.query.get(user_id)
+    if user:
+        user.subscription_tier = plan
+        user.subscription_status = 'active'
+        user.subscription_end = datetime.utcnow() + timedelta(days=30)
+        db.session.commit()
+        user_cache.pop(user_id)
+    
+    return jsonify({'success': True})
+
+@views.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('views.index'))
+
+@views.route('/dashboard/templates', methods=['GET', 'POST'])
+@login_required
+def templates_page():
+    if request.method == 'POST':
+        name = request.form.get('name')
+        description = request.form.get('description')
+        content = request.form.get('content')
+        is_premium = bool(request.form.get('is_premium'))
+        if name and content:
+            t = Template(name=name, description=description, content=content, is_premium=is_premium)
+            db.session.add(t)
+            db.session.commit()
+            template_cache.invalidate()
+            flash('Template added successfully!')
+        return redirect(url_for('views.templates_page'))
+    templates = get_templates(include_premium=True)
+    return render_template('templates.html', templates=templates)
+
+_sample_template_checked = False
+
+@views.before_app_request
+def ensure_sample_template():
+    global _sample_template_checked
+    if _sample_template_checked:
+        return
+    _sample_template_checked = True
+    if Template.query.count() == 0:
+        # Create default scraping template
+        default_template = {
+            'Ilan Basligi': 'p.description',
+            'IslemTipi': '.type-container span:nth-child(1)',
+            'Cinsi': '.type-container .type',
+            'Turu': 'div.col-md-7.col-6.text-right:not(.ad-owner)',
+            'Bolge': '.pr-features-right',
+            'IlanSahibi': 'div.ad-owner',
+            'Fiyat': 'div.price-container',
+            'IlanTarihi': 'div.col-md-7.col-8.text-right',
+            'Telefon': 'a[href^="tel:"]'
+        }
+        
+        t = Template(
+            name="Default Scraping Template",
+            description="Default template for scraping property listings",
+            content=json.dumps(default_template),
+            is_premium=False
+        )
+        db.session.add(t)
+        db.session.commit()
+        template_cache.invalidate()
+
+@views.before_request
+def limit_api_key_requests():
+    """Sliding-window rate limit per API key; session requests are not limited"""
+    if not request.path.startswith('/api/') or not current_user.is_authenticated:
+        return
+    digest = g.get('api_key_digest')
+    if digest is None:
+        return
+    limit = get_subscription_limits(current_user.subscription_tier)['api_requests_per_minute']
+    if not limit:
+        return jsonify({'error': 'API access requires the Enterprise plan'}), 403
+    allowed, remaining, retry_after = api_rate_limiter.hit(digest, limit, 60)
+    g.rate_limit = (limit, remaining)
+    if not allowed:
+        response = jsonify({'error': 'Rate limit exceeded'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+@views.after_request
+def add_rate_limit_headers(response):
+    if 'rate_limit' in g:
+        limit, remaining = g.rate_limit
+        response.headers['X-RateLimit-Limit'] = str(limit)
+        response.headers['X-RateLimit-Remaining'] = str(remaining)
+    return response
+
+@login_manager.unauthorized_handler
+def unauthorized():
+    # API clients get a status code, browsers the login page
+    if request.path.startswith('/api/'):
+        return jsonify({'error': 'Authentication required'}), 401
+    flash(login_manager.login_message)
+    return redirect(url_for('views.login', next=request.path))
+
+@views.route('/dashboard/revy', methods=['GET'])
+@login_required
+def revy_dashboard():
+    return render_template('revy_dashboard.html', has_session=has_revy_session(current_user.id))
+
+@views.route('/api/scrape-revy', methods=['POST'])
+@login_required
+def scrape_revy():
+    username = request.form.get('username')
+    password = request.form.get('password')
+    has_credentials = bool(username and password)
+    # With a saved session on the workers the credentials are only a fallback
+    if not has_credentials and not has_revy_session(current_user.id):
+        return jsonify({'error': 'Kullanıcı adı ve şifre zorunlu!'}), 400
+
+    limits = get_subscription_limits(current_user.subscription_tier)
+    user_id = current_user.id
+    allowed, _ = daily_quota.consume(user_id, limits['daily_jobs'], lambda: count_daily_jobs(user_id))
+    if not allowed:
+        return jsonify({'error': 'Daily limit reached'}), 403
+
+    # Scraping runs in the worker; progress and the CSV come from the regular job endpoints
+    job = ScrapingJob(user_id=user_id, url=REVY_LISTINGS_URL)
+    try:
+        db.session.add(job)
+        update_job_stats(user_id, total_jobs=1)
+        commit_job(job)
+    except Exception:
+        db.session.rollback()
+        daily_quota.release(user_id)
+        raise
+    if has_credentials:
+        store_revy_credentials(job.id, username, password)
+    enqueue(REVY_TASK, job.id)
+
+    return jsonify({
+        'job_id': job.id,
+        'status': 'started',
+        'message': 'Revy scraping job started successfully'
+    })
+
+# API: Start WhatsApp Bot
+@views.route('/api/whatsapp-bot', methods=['POST'])
+@login_required
+def start_whatsapp_bot():
+    # Handle file upload
+    if 'csv_file' not in request.files:
+        return jsonify({'error': 'CSV file required'}), 400
+    file = request.files['csv_file']
+    filename = secure_filename(file.filename)
+    csv_path = os.path.join('uploads', f"{uuid.uuid4()}_{filename}")
+    os.makedirs('uploads', exist_ok=True)
+    file.save(csv_path)
+    # Parse other params
+    test_mode = request.form.get('test_mode', 'false') == 'true'
+    test_phone = request.form.get('test_phone', '')
+    selected_templates = request.form.get('selected_templates')
+    custom_template = request.form.get('custom_template')
+    # selected_templates should be a JSON string
+    import json
+    if selected_templates:
+        selected_templates = json.loads(selected_templates)
+    # Start task
+    task = enqueue(WHATSAPP_TASK, current_user.id, csv_path, test_mode, test_phone, selected_templates, custom_template)
+    set_whatsapp_owner(task.id, current_user.id)
+    return jsonify({'task_id': task.id})
+
+# API: Poll WhatsApp Bot Progress
+@views.route('/api/whatsapp-bot/progress/<task_id>')
+@login_required
+def whatsapp_bot_progress(task_id):
+    if whatsapp_owner(task_id) != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    since = request.args.get('since')
+    if since and not is_stream_id(since):
+        return jsonify({'error': 'since must be a stream ID such as 1700000000000-0'}), 400
+    progress = int(redis_client.get(f"wa_progress:{task_id}") or 0)
+    logs, last_id = replay(whatsapp_events(task_id), since)
+    state = redis_client.get(f"wa_state:{task_id}")
+    state = state.decode() if state else 'unknown'
+    return jsonify({'progress': progress, 'logs': logs, 'last_id': last_id, 'state': state})
+
+# API: Continue after login
+@views.route('/api/whatsapp-bot/continue/<task_id>', methods=['POST'])
+@login_required
+def whatsapp_bot_continue(task_id):
+    if whatsapp_owner(task_id) != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    whatsapp_control(task_id).set_state(LOGIN_CONFIRMED)
+    return jsonify({'status': 'ok'})
+
+# API: Pause/resume/stop WhatsApp Bot
+@views.route('/api/whatsapp-bot/pause/<task_id>', methods=['POST'])
+@login_required
+def whatsapp_bot_pause(task_id):
+    if whatsapp_owner(task_id) != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    whatsapp_control(task_id).set_state(PAUSED)
+    return jsonify({'status': 'paused'})
+
+@views.route('/api/whatsapp-bot/resume/<task_id>', methods=['POST'])
+@login_required
+def whatsapp_bot_resume(task_id):
+    if whatsapp_owner(task_id) != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    whatsapp_control(task_id).set_state(RUNNING)
+    return jsonify({'status': 'running'})
+
+@views.route('/api/whatsapp-bot/stop/<task_id>', methods=['POST'])
+@login_required
+def whatsapp_bot_stop(task_id):
+    if whatsapp_owner(task_id) != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    whatsapp_control(task_id).set_state(STOPPED)
+    return jsonify({'status': 'stopped'})
+
+# API: Download result CSV
+@views.route('/api/whatsapp-bot/result/<task_id>')
+@login_required
+def whatsapp_bot_result(task_id):
+    if whatsapp_owner(task_id) != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    result_csv = redis_client.get(f"wa_result:{task_id}")
+    if not result_csv:
+        return jsonify({'error': 'No result'}), 404
+    result_csv = result_csv.decode()
+    return send_result(result_csv, f'whatsapp_results_{task_id}.csv')
+
+@views.route('/api/job/<int:job_id>/pause', methods=['POST'])
+@login_required
+def pause_job(job_id):
+    job = ScrapingJob.query.get_or_404(job_id)
+    if job.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    if job.status in FINISHED_STATUSES:
+        return jsonify({'error': 'Job already finished'}), 409
+    job_control(job_id).set_state(PAUSED)
+    set_job_status(job, 'paused')
+    commit_job(job)
+    return jsonify({'status': 'paused'})
+
+@views.route('/api/job/<int:job_id>/resume', methods=['POST'])
+@login_required
+def resume_job(job_id):
+    job = ScrapingJob.query.get_or_404(job_id)
+    if job.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    if job.status in FINISHED_STATUSES:
+        return jsonify({'error': 'Job already finished'}), 409
+    job_control(job_id).set_state(RUNNING)
+    set_job_status(job, 'running')
+    commit_job(job)
+    return jsonify({'status': 'running'})
+
+@views.route('/api/job/<int:job_id>/stop', methods=['POST'])
+@login_required
+def stop_job(job_id):
+    job = ScrapingJob.query.get_or_404(job_id)
+    if job.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    if job.status in FINISHED_STATUSES:
+        return jsonify({'error': 'Job already finished'}), 409
+    job_control(job_id).set_state(STOPPED)
+    set_job_status(job, 'failed')
+    commit_job(job)
+    return jsonify({'status': 'stopped'})
+
+@views.route('/api/webhooks', methods=['GET'])
+@login_required
+def list_webhooks():
+    webhooks = Webhook.query.filter_by(user_id=current_user.id).order_by(Webhook.id).all()
+    return jsonify([{
+        'id': w.id,
+        'url': w.url,
+        'secret': w.secret,
+        'created_at': w.created_at.isoformat()
+    } for w in webhooks])
+
+@views.route('/api/webhooks', methods=['POST'])
+@login_required
+def create_webhook():
+    """Register a URL that receives signed job.completed / job.failed / whatsapp.* events"""
+    data = request.get_json(silent=True) or request.form
+    url = (data.get('url') or '').strip()
+    try:
+        check_webhook_url(url)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if Webhook.query.filter_by(user_id=current_user.id).count() >= MAX_WEBHOOKS:
+        return jsonify({'error': f'At most {MAX_WEBHOOKS} webhooks per account'}), 400
+    webhook = Webhook(user_id=current_user.id, url=url, secret=secrets.token_hex(32))
+    db.session.add(webhook)
+    db.session.commit()
+    webhook_cache.invalidate()
+    return jsonify({'id': webhook.id, 'url': webhook.url, 'secret': webhook.secret}), 201
+
+@views.route('/api/webhooks/<int:webhook_id>', methods=['DELETE'])
+@login_required
+def delete_webhook(webhook_id):
+    webhook = Webhook.query.get_or_404(webhook_id)
+    if webhook.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    db.session.delete(webhook)
+    db.session.commit()
+    webhook_cache.invalidate()
+    return jsonify({'status': 'deleted'})
+
+@views.route('/api/webhooks/test', methods=['POST'])
+@login_required
+def test_webhooks():
+    queue_webhook_event(current_user.id, 'ping', {'user_id': current_user.id})
+    return jsonify({'status': 'queued'})
+
+@views.route('/api/job/<int:job_id>/live')
+@login_required
+def job_live_status(job_id):
+    snapshot = get_job_snapshot(job_id)
+    if snapshot is None:
+        abort(404)
+    if snapshot['user_id'] != current_user.id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    # Clients pass the last seen stream ID to only receive new entries
+    since = request.args.get('since')
+    if since and not is_stream_id(since):
+        return jsonify({'error': 'since must be a stream ID such as 1700000000000-0'}), 400
+    logs, last_id = replay(job_events(job_id), since)
+    progress = JobProgress(job_id).get()
+    return jsonify({
+        'logs': logs,
+        'last_id': last_id,
+        **progress
+    })
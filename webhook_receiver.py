@@ -0,0 +1,61 @@
+"""Local stand-in for a customer's webhook endpoint.
+
+Usage: python webhook_receiver.py --secret <webhook secret> [--port 8765] [--fail N]
+
+Register http://localhost:8765/ through POST /api/webhooks, then run jobs or
+call POST /api/webhooks/test. Every delivery is checked against the secret
+and printed. --fail answers the first N deliveries with 500 to exercise the
+worker's retry backoff.
+"""
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from webhooks import verify_signature
+
+
+def make_handler(secret, fail):
+    state = {'remaining_failures': fail}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+            valid = verify_signature(secret, self.headers.get('X-IScrape-Timestamp'), body,
+                                     self.headers.get('X-IScrape-Signature'))
+            if not valid:
+                print('rejected: bad signature')
+                self.send_response(401)
+            elif state['remaining_failures'] > 0:
+                state['remaining_failures'] -= 1
+                print(f"failing on purpose ({state['remaining_failures']} more)")
+                self.send_response(500)
+            else:
+                delivery = json.loads(body)
+                print(f"delivery {delivery['delivery_id']}: {len(delivery['events'])} event(s)")
+                for event in delivery['events']:
+                    print(f"  {event['event']:<20} {json.dumps(event['data'], ensure_ascii=False)}")
+                self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--secret', required=True)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fail', type=int, default=0)
+    args = parser.parse_args()
+
+    server = HTTPServer(('127.0.0.1', args.port), make_handler(args.secret, args.fail))
+    print(f'Listening on http://localhost:{args.port}/')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import hashlib
+import hmac
+import ipaddress
+import os
+import socket
+import time
+import urllib.parse
+
+WEBHOOK_TIMEOUT = float(os.getenv('WEBHOOK_TIMEOUT', 10))
+# Loopback and private receivers (webhook_receiver.py on localhost) are only allowed with this set
+WEBHOOK_ALLOW_PRIVATE = os.getenv('WEBHOOK_ALLOW_PRIVATE', '0') == '1'
+# Signed timestamps older than this are rejected by verify_signature
+SIGNATURE_TOLERANCE = 300
+
+_session = None
+
+
+def get_session():
+    """One pooled HTTP session per worker process, so repeat deliveries reuse connections"""
+    global _session
+    if _session is None:
+        # requests stays out of the web process, which only validates URLs
+        import requests
+        from requests.adapters import HTTPAdapter
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20)
+        _session.mount('http://', adapter)
+        _session.mount('https://', adapter)
+        _session.headers['User-Agent'] = 'iScrape-Webhooks/1.0'
+    return _session
+
+
+def check_webhook_url(url):
+    """Raise ValueError unless `url` is http(s) and its host only resolves to public addresses.
+
+    Keeps webhooks from reaching loopback, private, link-local (cloud metadata)
+    or reserved addresses. Checked on registration and again before every
+    delivery, since DNS answers can change in between.
+    """
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ValueError('A valid http(s) URL is required')
+    if WEBHOOK_ALLOW_PRIVATE:
+        return
+    try:
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(parsed.hostname, port, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise ValueError('The webhook host does not resolve')
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if getattr(ip, 'ipv4_mapped', None):
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError('Webhook URLs must not point to private or internal addresses')
+
+
+def sign(secret, timestamp, body):
+    """HMAC-SHA256 of "<timestamp>.<body>" with the webhook's secret"""
+    message = f'{timestamp}.{body}'.encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret, timestamp, body, signature, now=None):
+    """Receiver side check of the X-IScrape-Timestamp / X-IScrape-Signature headers"""
+    try:
+        age = abs((now or time.time()) - int(timestamp))
+    except (TypeError, ValueError):
+        return False
+    if age > SIGNATURE_TOLERANCE:
+        return False
+    return hmac.compare_digest(sign(secret, timestamp, body), signature or '')
+
+
+def build_delivery(delivery_id, events):
+    """JSON body of one delivery from already serialized events"""
+    return '{"delivery_id": "%s", "events": [%s]}' % (delivery_id, ', '.join(events))
+
+
+def post_webhook(url, secret, body):
+    """POST a signed delivery; raises ValueError when the URL now resolves to an internal address"""
+    check_webhook_url(url)
+    timestamp = str(int(time.time()))
+    # Redirects are not followed, a public receiver could point them inside the network
+    response = get_session().post(url, data=body.encode(), timeout=WEBHOOK_TIMEOUT, allow_redirects=False, headers={
+        'Content-Type': 'application/json',
+        'X-IScrape-Timestamp': timestamp,
+        'X-IScrape-Signature': sign(secret, timestamp, body)
+    })
+    return response.status_code
@@ -0,0 +1,545 @@
+import os
+import sys
+import platform
+import json
+import time
+import random
+import urllib.parse
+import uuid
+from datetime import datetime
+import pandas as pd
+import requests
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.keys import Keys
+from webdriver_manager.chrome import ChromeDriverManager
+from app import create_app
+from celery_app import make_celery
+from extensions import db, redis_client
+from models import ScrapingJob, Template, Webhook
+from jobs import (SCRAPE_TASK, WHATSAPP_TASK, REVY_TASK, REVY_LOGIN_URL, JobProgress, job_control,
+                  whatsapp_control, whatsapp_events, pop_revy_credentials, set_revy_session_saved,
+                  set_job_status, commit_job, queue_webhook_event, WEBHOOK_FLUSH_TASK,
+                  WEBHOOK_DELIVER_TASK, RETENTION_TASK)
+from session_vault import SessionVault, restore_revy_session, whatsapp_logged_in
+from results import ResultWriter, job_result_path, whatsapp_result_path, listing_id
+from listings import RecentListings, store_job_listings
+from retention import WHATSAPP_RESULT_RETENTION_SECONDS, run_retention
+from webhooks import build_delivery, post_webhook
+from job_control import JobStopped, WAITING_LOGIN, LOGIN_CONFIRMED, RUNNING, PAUSED, STOPPED
+
+# Worker entry point: celery -A worker.celery worker --loglevel=info
+flask_app = create_app()
+celery = make_celery(flask_app)
+# Periodic tasks: celery -A worker.celery beat
+celery.conf.beat_schedule = {
+    'enforce-retention': {'task': RETENTION_TASK, 'schedule': int(os.getenv('RETENTION_INTERVAL', 3600))}
+}
+
+WEBHOOK_MAX_EVENTS = 500
+WEBHOOK_MAX_RETRIES = int(os.getenv('WEBHOOK_MAX_RETRIES', 8))
+# Base delay in seconds, doubled on every retry (10s, 20s, 40s, ... about 40 min in total)
+WEBHOOK_RETRY_DELAY = int(os.getenv('WEBHOOK_RETRY_DELAY', 10))
+
+def start_chrome(headless=False):
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument('--headless')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+    if sys.platform == 'darwin' and platform.machine() == 'arm64':
+        options.binary_location = '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'
+        return webdriver.Chrome(options=options)
+    driver_path = ChromeDriverManager().install()
+    service = Service(driver_path)
+    return webdriver.Chrome(service=service, options=options)
+
+def find_total_pages(driver):
+    try:
+        page_links = driver.find_elements(By.CSS_SELECTOR, "a.page-link[data-page]")
+        return max([int(link.get_attribute("data-page")) for link in page_links])
+    except Exception:
+        return 1
+
+def collect_listing_links(driver, base_url, total_pages, progress, control):
+    """Walk every listings page and return the unique detail links in page order"""
+    links = []
+    seen = set()
+    for page in range(1, total_pages + 1):
+        control.checkpoint()
+        progress.set(current_page=page)
+        if page > 1:
+            driver.get(f"{base_url}&page={page}")
+        try:
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'a[href*="/app/portfoy/detay/"]'))
+            )
+        except Exception:
+            progress.log(f"Sayfa {page}: ilan bulunamadı")
+            continue
+        for e in driver.find_elements(By.CSS_SELECTOR, 'a[href*="/app/portfoy/detay/"]'):
+            href = e.get_attribute('href')
+            # Integer IDs instead of the URL strings keep the set small on large portfolios
+            key = listing_id(href)
+            if key not in seen:
+                seen.add(key)
+                links.append(href)
+        progress.log(f"Sayfa {page}/{total_pages} tarandı, toplam {len(links)} ilan")
+    return links
+
+def save_results(job, writer, progress, copied=(), complete=True):
+    """Close the job's streamed result file and record the outcome"""
+    if writer.close():
+        try:
+            stored = store_job_listings(job, writer.path, copied, complete)
+            progress.log(f"{stored} ilan kaydedildi.")
+        except Exception as e:
+            # The result file is complete, so the job still succeeds
+            db.session.rollback()
+            progress.log(f"İlanlar kaydedilemedi: {e}")
+        set_job_status(job, 'completed')
+        job.completed_at = datetime.utcnow()
+        job.result = writer.path
+        progress.log("İşlem tamamlandı. Sonuç dosyası hazır.")
+    else:
+        set_job_status(job, 'failed')
+        job.result = 'No data found'
+        progress.log("Hiç veri bulunamadı.")
+    commit_job(job)
+
+def fail_job(job, progress, message, log_message):
+    db.session.rollback()
+    set_job_status(job, 'failed')
+    job.result = message
+    commit_job(job)
+    progress.log(log_message)
+
+# Celery Tasks
+@celery.task(name=SCRAPE_TASK)
+def process_scraping_job(job_id):
+    """Process a scraping job asynchronously"""
+    job = ScrapingJob.query.get(job_id)
+    if not job:
+        return
+    driver = None
+    writer = None
+    progress = JobProgress(job_id)
+    # Subscribe before the slow driver start so no pause/stop is missed
+    control = job_control(job_id).subscribe()
+    try:
+        driver = start_chrome()
+
+        template = Template.query.get(job.template_id)
+        if not template:
+            raise ValueError("Template not found")
+        template_config = json.loads(template.content)
+        # Rows are compressed to disk as they are scraped instead of piling up in memory
+        writer = ResultWriter(job_result_path(job.id), list(template_config) + ['Ilan Linki'])
+        recent = RecentListings(job.user_id, writer.fieldnames)
+        base_url = job.url
+        driver.get(base_url)
+        time.sleep(5)
+        progress.log(f"Başlangıç: {base_url}")
+        total_pages = find_total_pages(driver)
+        progress.log(f"Toplam sayfa: {total_pages}")
+        processed_links = set()
+        total_ads = 0
+        processed_ads = 0
+        # Tüm ilanları saymak için ilk sayfadaki ilanları say
+        try:
+            all_links = set()
+            for page in range(1, total_pages + 1):
+                if page > 1:
+                    page_url = f"{base_url}&page={page}"
+                    driver.get(page_url)
+                    time.sleep(2)
+                links = [e.get_attribute('href') for e in driver.find_elements(By.CSS_SELECTOR, 'a[href*="/app/portfoy/detay/"]')]
+                for l in links:
+                    all_links.add(listing_id(l))
+            total_ads = len(all_links)
+            progress.set(total_ads=total_ads)
+            progress.log(f"Toplam ilan: {total_ads}")
+        except Exception as e:
+            progress.set(total_ads=0)
+            progress.log(f"Toplam ilan sayısı alınamadı: {e}")
+        # Asıl scraping
+        for page in range(1, total_pages + 1):
+            progress.set(current_page=page)
+            progress.log(f"Sayfa {page} işleniyor...")
+            control.checkpoint()
+            if page > 1:
+                page_url = f"{base_url}&page={page}"
+                driver.get(page_url)
+                time.sleep(2)
+            links = [e.get_attribute('href') for e in driver.find_elements(By.CSS_SELECTOR, 'a[href*="/app/portfoy/detay/"]')]
+            unique_links = {}
+            for l in links:
+                key = listing_id(l)
+                if key not in processed_links:
+                    unique_links.setdefault(key, l)
+            # Listings another job fetched recently are copied from its result
+            copied = recent.rows(unique_links.values())
+            for key, href in unique_links.items():
+                control.checkpoint()
+                processed_links.add(key)
+                try:
+                    data = copied.get(href)
+                    if data is None:
+                        driver.get(href)
+                        WebDriverWait(driver, 10).until(
+                            EC.presence_of_element_located((By.CSS_SELECTOR, 'p.description'))
+                        )
+                        data = {}
+                        for field, selector in template_config.items():
+                            try:
+                                data[field] = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
+                            except:
+                                data[field] = ''
+                    data['Ilan Linki'] = href
+                    writer.write(data)
+                    processed_ads += 1
+                    percent = int((processed_ads / total_ads) * 100) if total_ads else 0
+                    progress.set(processed_ads=processed_ads, progress=percent)
+                    progress.log(f"[{processed_ads}/{total_ads}] {data.get('Ilan Basligi', '')}")
+                except Exception as e:
+                    progress.log(f"Hata: {href} - {e}")
+                    continue
+        save_results(job, writer, progress, recent.copied)
+    except JobStopped as e:
+        fail_job(job, progress, e.reason, e.log_message)
+    except Exception as e:
+        fail_job(job, progress, str(e), f"Beklenmeyen hata: {e}")
+    finally:
+        if writer:
+            writer.discard()
+        control.close()
+        progress.finish(job.status)
+        if driver:
+            try:
+                driver.quit()
+            except:
+                pass
+
+@celery.task(name=REVY_TASK)
+def process_revy_job(job_id):
+    """Log in to Revy (saved session first, then the user's credentials) and scrape every listings page"""
+    job = ScrapingJob.query.get(job_id)
+    if not job:
+        return
+    driver = None
+    writer = None
+    progress = JobProgress(job_id)
+    control = job_control(job_id).subscribe()
+    try:
+        credentials = pop_revy_credentials(job_id)
+        vault = SessionVault('revy', job.user_id)
+        driver = start_chrome(headless=True)
+        if restore_revy_session(driver, vault, job.url):
+            progress.log("Kayıtlı Revy oturumu kullanıldı")
+        else:
+            set_revy_session_saved(job.user_id, False)
+            if not credentials:
+                raise ValueError("Kayıtlı oturum geçersiz, lütfen giriş bilgilerinizi girin")
+            driver.get(REVY_LOGIN_URL)
+            # Giriş formunu doldur
+            WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.NAME, 'phone')))
+            driver.find_element(By.NAME, 'phone').send_keys(credentials['username'])
+            driver.find_element(By.NAME, 'password').send_keys(credentials['password'])
+            driver.find_element(By.CSS_SELECTOR, 'button[type="submit"]').click()
+            WebDriverWait(driver, 20).until(EC.url_contains('/app/portfoy/ilanlar'))
+            vault.save_cookies(driver)
+            set_revy_session_saved(job.user_id, True)
+            progress.log("Revy girişi başarılı, oturum kaydedildi")
+
+        base_url = job.url
+        if driver.current_url != base_url:
+            driver.get(base_url)
+        try:
+            WebDriverWait(driver, 20).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'a[href*="/app/portfoy/detay/"]'))
+            )
+        except Exception:
+            pass  # boş portföy, sayfalama yok
+        total_pages = find_total_pages(driver)
+        progress.log(f"Toplam sayfa: {total_pages}")
+        links = collect_listing_links(driver, base_url, total_pages, progress, control)
+        total_ads = len(links)
+        progress.set(total_ads=total_ads)
+        progress.log(f"Toplam ilan: {total_ads}")
+
+        writer = ResultWriter(job_result_path(job.id), ['Başlık', 'Fiyat', 'Telefon', 'Link'])
+        recent = RecentListings(job.user_id, writer.fieldnames)
+        copied = recent.rows(links)
+        if copied:
+            progress.log(f"{len(copied)} ilan yakın zamanda tarandı, önceki sonuçtan alınacak")
+        failed_ads = 0
+        for processed_ads, href in enumerate(links, 1):
+            control.checkpoint()
+            row = copied.get(href)
+            if row is None:
+                try:
+                    driver.get(href)
+                    WebDriverWait(driver, 10).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, 'p.description'))
+                    )
+                except Exception as e:
+                    progress.log(f"Hata: {href} - {e}")
+                    failed_ads += 1
+                    continue
+                row = {}
+                for field, selector in (('Başlık', 'p.description'), ('Fiyat', 'div.price-container'),
+                                        ('Telefon', 'a[href^="tel:"]')):
+                    try:
+                        row[field] = driver.find_element(By.CSS_SELECTOR, selector).text.strip()
+                    except Exception:
+                        row[field] = ''
+            row['Link'] = href
+            writer.write(row)
+            progress.set(processed_ads=processed_ads, progress=int(processed_ads / total_ads * 100))
+            progress.log(f"[{processed_ads}/{total_ads}] {row['Başlık']}")
+        if failed_ads:
+            progress.log(f"{failed_ads} ilan açılamadı, kaldırılan ilanlar bu çalışmada işaretlenmeyecek")
+        save_results(job, writer, progress, recent.copied, complete=not failed_ads)
+    except JobStopped as e:
+        fail_job(job, progress, e.reason, e.log_message)
+    except Exception as e:
+        fail_job(job, progress, str(e), f"Beklenmeyen hata: {e}")
+    finally:
+        if writer:
+            writer.discard()
+        control.close()
+        progress.finish(job.status)
+        if driver:
+            try:
+                driver.quit()
+            except:
+                pass
+
+# WhatsApp Bot Celery Task
+@celery.task(bind=True, name=WHATSAPP_TASK)
+def whatsapp_bot_task(self, user_id, csv_path, test_mode, test_phone, selected_templates, custom_template):
+    MESSAGE_TEMPLATES = {
+        "SATILIK": {
+            "template1": "Merhaba, ilanınız *\"{title}\"* satışa sunduğunuz bu mülk için alıcı portföyümüze eklenebilir. Süreci hızlandırmak isterseniz yardımcı olabilirim.",
+            "template2": "Merhaba, *\"{title}\"* ilanınızı inceledim. Mülkünüz için potansiyel alıcılarımız mevcut. Satış sürecinizi hızlandırmak için görüşmek ister misiniz?",
+            "template3": "Merhaba, *\"{title}\"* ilanınız dikkatimi çekti. Benzer özellikteki mülkler için aktif alıcılarımız var. Satış sürecinizde size nasıl yardımcı olabilirim?"
+        },
+        "KIRALIK": {
+            "template1": "Merhaba, ilanınız *\"{title}\"* kiralık mülklerim arasında dikkatimi çekti. Kiralama sürecini hızlıca yönetmek ister misiniz?",
+            "template2": "Merhaba, *\"{title}\"* ilanınızı gördüm. Kiralık mülk arayan müşterilerimiz mevcut. Kiracı bulma sürecinizde size yardımcı olabilirim.",
+            "template3": "Merhaba, *\"{title}\"* ilanınız için potansiyel kiracılarımız var. Kiralama sürecinizi hızlandırmak için görüşmek ister misiniz?"
+        }
+    }
+    DEFAULT_TEMPLATE = "Merhaba, ilanınız *\"{title}\"* hakkında bilgi vermek isterim."
+    DELAY_BETWEEN_MESSAGES = 5
+
+    task_id = self.request.id
+    progress_key = f"wa_progress:{task_id}"
+    result_csv = whatsapp_result_path(task_id)
+    control = whatsapp_control(task_id).subscribe()
+    events = whatsapp_events(task_id)
+    redis_client.set(progress_key, 0)
+    control.set_state(WAITING_LOGIN)
+    vault = SessionVault('whatsapp', user_id)
+    profile_dir = None
+
+    def log(msg):
+        events.log(msg)
+
+    driver = None
+    logged_in = False
+    try:
+        log("Başlatılıyor...")
+        # A corrupt vault fails the task below instead of leaving it waiting for login
+        profile_dir = vault.open_profile()
+        if test_mode and test_phone:
+            log(f"🧪 Test modu aktif: Mesajlar {test_phone} numarasına gidecek")
+            test_phone = test_phone.replace("+", "").replace(" ", "")
+        else:
+            log("⚠️ Test modu kapalı: Gerçek numaralara mesaj gönderilecek")
+
+        # Start WebDriver on the user's saved profile so WhatsApp Web stays linked
+        options = webdriver.ChromeOptions()
+        options.add_argument(f'--user-data-dir={profile_dir}')
+        try:
+            if sys.platform == 'darwin' and platform.machine() == 'arm64':
+                options.binary_location = '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'
+                driver = webdriver.Chrome(options=options)
+            else:
+                driver_path = ChromeDriverManager().install()
+                service = Service(driver_path)
+                driver = webdriver.Chrome(service=service, options=options)
+            log("✅ ChromeDriver başarıyla başlatıldı.")
+        except Exception as e:
+            log(f"ChromeDriver başlatılamadı: {e}")
+            driver = webdriver.Chrome(options=options)
+
+        # Open WhatsApp Web and wait for login
+        driver.get("https://web.whatsapp.com")
+        if whatsapp_logged_in(driver):
+            log("✅ Kayıtlı WhatsApp oturumu kullanıldı, mesaj gönderimine başlanıyor...")
+        else:
+            log("❗ Lütfen WhatsApp Web'e QR kod ile giriş yapın ve web arayüzünden 'Devam Et' butonuna tıklayın...")
+            # Block until the frontend confirms the login (or stops the task)
+            if control.wait_for(LOGIN_CONFIRMED, STOPPED) == STOPPED:
+                log("Kullanıcı tarafından durduruldu.")
+                return
+            log("✅ Giriş onaylandı, mesaj gönderimine başlanıyor...")
+        logged_in = True
+        # A pause pressed meanwhile holds the task at its first checkpoint
+        if control.state() != PAUSED:
+            control.set_state(RUNNING)
+
+        # Load CSV
+        if not os.path.exists(csv_path):
+            log(f"CSV dosyası bulunamadı: {csv_path}")
+            control.set_state("failed")
+            return
+        with open(csv_path, 'r', encoding='utf-8') as f:
+            first_line = f.readline().strip()
+            delimiter = ',' if ',' in first_line else ';' if ';' in first_line else '\t'
+        df = pd.read_csv(csv_path, encoding='utf-8', sep=delimiter, on_bad_lines='skip')
+        # Standardize columns
+        required_columns = {
+            'Telefon': ['Telefon', 'telefon', 'PHONE', 'phone'],
+            'Ilan Basligi': ['Ilan Basligi', 'İlan Başlığı', 'ILAN BASLIGI', 'ilan_basligi'],
+            'IslemTipi': ['IslemTipi', 'İşlem Tipi', 'ISLEMTIPI', 'islem_tipi']
+        }
+        for standard_name, possible_names in required_columns.items():
+            found = False
+            for col in df.columns:
+                if col in possible_names:
+                    df = df.rename(columns={col: standard_name})
+                    found = True
+                    break
+            if not found:
+                log(f"CSV dosyasında gerekli sütun bulunamadı: {standard_name}")
+                control.set_state("failed")
+                return
+        df_unique = df.drop_duplicates(subset=["Telefon"]).reset_index(drop=True)
+        log(f"📊 Toplam {len(df_unique)} benzersiz telefon numarası bulundu")
+
+        # Send messages
+        sent_rows = []
+        for idx, row in df_unique.iterrows():
+            try:
+                control.checkpoint()
+            except JobStopped as e:
+                log(e.log_message)
+                break
+            phone = test_phone if test_mode else row["Telefon"].replace("+", "").replace(" ", "")
+            title = row.get("Ilan Basligi", "").strip()
+            islem = row.get("IslemTipi", "").strip().upper()
+            if selected_templates and islem in selected_templates:
+                templates = selected_templates[islem]
+                if templates:
+                    if "custom" in templates and custom_template:
+                        template = custom_template
+                    else:
+                        template_key = random.choice(templates)
+                        template = MESSAGE_TEMPLATES[islem][template_key]
+                else:
+                    template = DEFAULT_TEMPLATE
+            else:
+                template = DEFAULT_TEMPLATE
+            message = template.format(title=title)
+            encoded_msg = urllib.parse.quote_plus(message)
+            url = f"https://web.whatsapp.com/send?phone={phone}&text={encoded_msg}"
+            driver.get(url)
+            try:
+                input_box = WebDriverWait(driver, 20).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, 'div[contenteditable="true"][data-tab="10"]'))
+                )
+                input_box.click()
+                time.sleep(0.5)
+                input_box.send_keys(Keys.ENTER)
+                time.sleep(1)
+                log(f"✅ Mesaj gönderildi: {phone}")
+                sent_rows.append(row)
+            except Exception as e:
+                log(f"❌ Mesaj gönderilemedi: {phone} - {e}")
+            redis_client.set(progress_key, int((idx+1)/len(df_unique)*100))
+            # Wait between messages, but wake up at once on a stop request
+            control.wait_for(STOPPED, timeout=DELAY_BETWEEN_MESSAGES)
+        # Save results
+        os.makedirs(os.path.dirname(result_csv), exist_ok=True)
+        pd.DataFrame(sent_rows).to_csv(result_csv, index=False, compression='gzip')
+        control.set_state("completed")
+        log("✅ Tüm mesajlar işlendi. Sonuçlar indirilebilir.")
+        redis_client.set(f"wa_result:{task_id}", result_csv, ex=WHATSAPP_RESULT_RETENTION_SECONDS)
+    except Exception as e:
+        log(f"Beklenmeyen hata: {str(e)}")
+        control.set_state("failed")
+    finally:
+        final_state = control.state()
+        control.close()
+        events.finish(final_state, progress_key, control.state_key)
+        queue_webhook_event(user_id, f'whatsapp.{final_state}', {
+            'task_id': task_id,
+            'status': final_state,
+            'result_url': f'/api/whatsapp-bot/result/{task_id}' if final_state == 'completed' else None
+        })
+        if driver:
+            try:
+                driver.quit()
+            except:
+                pass
+        try:
+            if logged_in:
+                vault.save_profile(profile_dir)
+        finally:
+            if profile_dir:
+                vault.discard_profile(profile_dir)
+            # The upload is only needed by this run
+            if os.path.exists(csv_path):
+                os.remove(csv_path)
+
+# Webhook delivery tasks, routed to the webhooks queue by celery_app
+@celery.task(name=WEBHOOK_FLUSH_TASK)
+def flush_webhook_events(user_id):
+    """Send the events buffered for a user as one signed delivery per webhook"""
+    # Clear the flag first so an event arriving meanwhile schedules a new flush
+    redis_client.delete(f'webhooks:scheduled:{user_id}')
+    pending_key = f'webhooks:pending:{user_id}'
+    pipe = redis_client.pipeline()
+    pipe.lrange(pending_key, 0, -1)
+    pipe.delete(pending_key)
+    events = [e.decode() for e in pipe.execute()[0]]
+    if not events:
+        return
+    webhook_ids = [w.id for w in Webhook.query.filter_by(user_id=user_id).all()]
+    for start in range(0, len(events), WEBHOOK_MAX_EVENTS):
+        body = build_delivery(uuid.uuid4().hex, events[start:start + WEBHOOK_MAX_EVENTS])
+        for webhook_id in webhook_ids:
+            deliver_webhook.delay(webhook_id, body)
+
+@celery.task(bind=True, name=WEBHOOK_DELIVER_TASK, max_retries=WEBHOOK_MAX_RETRIES)
+def deliver_webhook(self, webhook_id, body):
+    """POST one delivery; network errors, 429 and 5xx are retried with exponential backoff"""
+    webhook = Webhook.query.get(webhook_id)
+    if not webhook:
+        return
+    try:
+        status = post_webhook(webhook.url, webhook.secret, body)
+    except ValueError:
+        # The host resolves to an internal address now, never deliver there
+        return
+    except requests.RequestException as e:
+        error = e
+    else:
+        if status < 300:
+            return status
+        if status != 429 and status < 500:
+            # Receiver rejected the payload, retrying would not help
+            return status
+        error = RuntimeError(f'Webhook receiver answered {status}')
+    countdown = WEBHOOK_RETRY_DELAY * 2 ** self.request.retries
+    raise self.retry(exc=error, countdown=countdown + random.uniform(0, WEBHOOK_RETRY_DELAY))
+
+@celery.task(name=RETENTION_TASK)
+def enforce_retention():
+    """Expire old results, evict over-quota ones and clean up leftovers; scheduled by beat"""
+    return run_retention()